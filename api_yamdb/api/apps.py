@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .signals import (connect_count_invalidation,
+                              connect_token_invalidation)
+        connect_count_invalidation()
+        connect_token_invalidation()
@@ -0,0 +1,140 @@
+"""
+JWT authentication without a user query per request.
+
+Access tokens issued by `get_jwt_token` carry the user claims the
+permissions need (`username`, `role`, `is_superuser`) and the user
+`token_version`. Validated tokens are kept in a per-process LRU cache,
+so repeated requests skip signature verification, and the user is
+built from the claims instead of being loaded from the database.
+
+The token version is bumped whenever a claim changes or the user is
+deactivated or deleted; together with it the `auth` CacheVersion is
+bumped. A worker compares that version with its own at most every
+JWT_AUTH_CHECK_INTERVAL seconds and forgets the versions it knows, so
+the next request of the affected user reloads the user from the
+database and a stale token falls back to the stored role.
+Tokens without the claims are authenticated the usual way.
+Revoked tokens are rejected, see `api.revocation`.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+from reviews.models import User
+from reviews.versions import get_version
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .revocation import revocation_list
+
+VERSION_NAME = 'auth'
+TOKEN_CLAIMS = ('username', 'role', 'is_superuser')
+VERSION_CLAIM = 'ver'
+
+
+def access_token_for(user: User) -> AccessToken:
+    token = AccessToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class TokenCache:
+    """LRU cache of validated tokens and known user token versions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self._versions = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def check_version(self) -> None:
+        interval = getattr(settings, 'JWT_AUTH_CHECK_INTERVAL', 1)
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < interval:
+                return
+            self._checked_at = now
+        version = get_version(VERSION_NAME)
+        with self._lock:
+            if version != self._version:
+                self._versions.clear()
+                self._version = version
+
+    def get_token(self, raw_token: str):
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is not None:
+                self._tokens.move_to_end(raw_token)
+            return token
+
+    def add_token(self, raw_token: str, token) -> None:
+        size = getattr(settings, 'JWT_AUTH_CACHE_SIZE', 1024)
+        with self._lock:
+            self._tokens[raw_token] = token
+            while len(self._tokens) > size:
+                self._tokens.popitem(last=False)
+
+    def get_user_version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id)
+
+    def set_user_version(self, user_id, version: int) -> None:
+        with self._lock:
+            self._versions[user_id] = version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._versions.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_validated_token(self, raw_token):
+        token = self.get_cached_token(raw_token)
+        if revocation_list.is_revoked(token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken('Token is revoked')
+        return token
+
+    def get_cached_token(self, raw_token):
+        if isinstance(raw_token, bytes):
+            raw_token = raw_token.decode()
+        token = token_cache.get_token(raw_token)
+        if token is not None:
+            # Expiration is checked again, the signature is not.
+            try:
+                token.check_exp()
+                return token
+            except TokenError:
+                pass
+        token = super().get_validated_token(raw_token)
+        token_cache.add_token(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        token_cache.check_version()
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        version = token_cache.get_user_version(user_id)
+        if version != validated_token[VERSION_CLAIM]:
+            user = super().get_user(validated_token)
+            token_cache.set_user_version(user_id, user.token_version)
+            return user
+        user = User(
+            id=user_id,
+            **{claim: validated_token[claim] for claim in TOKEN_CLAIMS}
+        )
+        user._state.adding = False
+        user._state.db = router.db_for_read(User)
+        return user
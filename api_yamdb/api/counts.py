@@ -0,0 +1,170 @@
+"""
+Total counts for paginated lists.
+
+Counts are cached per endpoint and normalized filter set. The cache key
+includes a version of every table the count query reads. The versions
+are CacheVersion rows bumped by model signals once the write commits,
+so a write made by any worker invalidates dependent counts in all of
+them, while the counts themselves may stay in a per-process cache.
+Above PAGINATION_EXACT_COUNT_LIMIT rows the count is estimated.
+"""
+import hashlib
+import re
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models.lookups import Lookup
+from django.db.models.sql import Query
+from django.utils.functional import cached_property
+from reviews.models import CacheVersion
+from reviews.versions import bump_version
+
+TABLE_VERSION = 'table:{}'
+COUNT_KEY = 'count:{}'
+IGNORED_PARAMS = ('page', 'page_size', 'cursor', 'format')
+
+
+def bump_table_versions(tables: Iterable[str]) -> None:
+    """Bumps the versions of the tables when the transaction commits."""
+    names = sorted({TABLE_VERSION.format(table) for table in tables})
+
+    def bump():
+        for name in names:
+            bump_version(name)
+
+    transaction.on_commit(bump)
+
+
+def get_table_versions(
+        tables: Iterable[str]) -> Dict[str, Tuple[int, datetime]]:
+    """(version, modified) of the tables that were ever written."""
+    names = {TABLE_VERSION.format(table): table for table in tables}
+    return {
+        names[name]: (version, modified) for name, version, modified in
+        CacheVersion.objects.filter(name__in=names)
+        .values_list('name', 'version', 'modified')
+    }
+
+
+def table_validator(tables: Iterable[str]) -> tuple:
+    """
+    ETag / Last-Modified validator of a representation read from the
+    tables: their versions and the time of the last write to any of
+    them. Deletes bump both, unlike the versions of remaining rows.
+    """
+    tables = sorted(set(tables))
+    versions = get_table_versions(tables)
+    return (
+        tuple(versions.get(table, (0, None))[0] for table in tables),
+        max((modified for _, modified in versions.values()), default=None)
+    )
+
+
+def expression_tables(node) -> Set[str]:
+    """Tables read by subqueries of a where node or an expression."""
+    if isinstance(node, Query):
+        return query_tables(node)
+    if isinstance(getattr(node, 'query', None), Query):
+        return query_tables(node.query)
+    if hasattr(node, 'children'):
+        children = node.children
+    elif isinstance(node, Lookup):
+        children = (node.lhs, node.rhs)
+    elif hasattr(node, 'get_source_expressions'):
+        children = node.get_source_expressions()
+    else:
+        return set()
+    tables = set()
+    for child in children:
+        tables |= expression_tables(child)
+    return tables
+
+
+def query_tables(query: Query) -> Set[str]:
+    tables = {query.get_meta().db_table, *query.extra_tables}
+    tables.update(
+        join.table_name for alias, join in query.alias_map.items()
+        if query.alias_refcount[alias]
+    )
+    for node in (query.where, *query.annotations.values()):
+        tables |= expression_tables(node)
+    return tables
+
+
+def read_tables(queryset) -> Tuple[str, ...]:
+    """Tables joined or read through subqueries by the query."""
+    return tuple(sorted(query_tables(queryset.query)))
+
+
+def count_cache_key(request, queryset) -> str:
+    params = sorted(
+        (name, sorted(request.query_params.getlist(name)))
+        for name in request.query_params
+        if name not in IGNORED_PARAMS
+    )
+    tables = read_tables(queryset)
+    versions = get_table_versions(tables)
+    key = repr((
+        request.path,
+        params,
+        [(table, versions.get(table, (0, None))[0]) for table in tables],
+    ))
+    return COUNT_KEY.format(hashlib.md5(key.encode()).hexdigest())
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """Planner estimate on PostgreSQL, the max pk for unfiltered tables."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = cursor.fetchone()[0]
+        match = re.search(r'rows=(\d+)', plan)
+        return int(match.group(1)) if match else None
+    if not queryset.query.where:
+        return queryset.order_by('-pk').values_list('pk', flat=True).first()
+    return None
+
+
+def bounded_count(queryset) -> Tuple[int, bool]:
+    """Returns the count and whether it is exact."""
+    if not hasattr(queryset, 'query'):
+        return len(queryset), True
+    limit = getattr(settings, 'PAGINATION_EXACT_COUNT_LIMIT', None)
+    if limit is None:
+        return queryset.count(), True
+    count = queryset.order_by()[:limit + 1].count()
+    if count <= limit:
+        return count, True
+    estimate = estimate_count(queryset)
+    return max(estimate or 0, count), False
+
+
+class CachedCountPaginator(Paginator):
+    """Django paginator taking its count from the count cache."""
+
+    def __init__(self, *args, cache_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.count_exact = True
+
+    @cached_property
+    def count(self):
+        if self.cache_key is not None:
+            cached = cache.get(self.cache_key)
+            if cached is not None:
+                count, self.count_exact = cached
+                return count
+        count, self.count_exact = bounded_count(self.object_list)
+        if self.cache_key is not None:
+            cache.set(
+                self.cache_key,
+                (count, self.count_exact),
+                getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+            )
+        return count
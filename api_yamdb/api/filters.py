@@ -1,25 +1,123 @@
+from django import forms
 from django_filters import rest_framework as filters
-from reviews.models import Title
+from reviews.catalog import catalog
+from reviews.models import GenreTitle, Review, Title
+from reviews.search import review_index, title_index
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+# Range of the PositiveIntegerField year column.
+YEAR_MAX = 2147483647
+
+
+def split_values(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def resolve_slugs(objects, values, prefix=False):
+    """
+    Resolves slugs (or slug prefixes) of cached catalog objects
+    to ids without touching the database. Returns a list
+    of id groups, one group per value.
+    """
+    if prefix:
+        return [
+            [obj.pk for obj in objects
+             if obj.slug.lower().startswith(value.lower())]
+            for value in values
+        ]
+    ids = {obj.slug: obj.pk for obj in objects}
+    return [[ids[value]] if value in ids else [] for value in values]
+
+
+class YearFilter(filters.NumberFilter):
+    """A whole year, values out of the column range answer 400."""
+    field_class = forms.IntegerField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('min_value', 0)
+        kwargs.setdefault('max_value', YEAR_MAX)
+        super().__init__(*args, **kwargs)
 
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
+    """
+    `category` and `genre` take exact slugs, `category_prefix` and
+    `genre_prefix` slug prefixes, all comma separated. Titles match
+    any of the genres, or all of them with `genre_match=all`.
+    Slugs are resolved to ids from the catalog cache, titles are then
+    filtered by indexed foreign keys.
+
+    `year` is exact, `year_min`/`year_max` bound a range and
+    `decade=1980` selects 1980-1989, all as integer comparisons
+    served by the year and (category, year) indexes.
+    """
+    category = filters.CharFilter(method='filter_category')
+    category_prefix = filters.CharFilter(method='filter_category')
+    genre = filters.CharFilter(method='filter_genre')
+    genre_prefix = filters.CharFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(
+        choices=((MATCH_ANY, MATCH_ANY), (MATCH_ALL, MATCH_ALL)),
+        method='filter_genre_match'
     )
     name = filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
-    year = filters.NumberFilter(
-        field_name='year',
-        lookup_expr='icontains'
-    )
+    year = YearFilter(field_name='year')
+    year_min = YearFilter(field_name='year', lookup_expr='gte')
+    year_max = YearFilter(field_name='year', lookup_expr='lte')
+    decade = YearFilter(method='filter_decade')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = (
+            'category', 'category_prefix', 'genre', 'genre_prefix',
+            'genre_match', 'name', 'year', 'year_min', 'year_max',
+            'decade', 'search',
+        )
+
+    def filter_category(self, queryset, name, value):
+        groups = resolve_slugs(
+            catalog.get().categories, split_values(value),
+            prefix=name.endswith('_prefix')
+        )
+        return queryset.filter(
+            category_id__in=[pk for group in groups for pk in group]
+        )
+
+    def filter_genre(self, queryset, name, value):
+        groups = resolve_slugs(
+            catalog.get().genres, split_values(value),
+            prefix=name.endswith('_prefix')
+        )
+        if self.form.cleaned_data.get('genre_match') != MATCH_ALL:
+            groups = [[pk for group in groups for pk in group]]
+        for group in groups:
+            queryset = queryset.filter(id__in=GenreTitle.objects.filter(
+                genre_id__in=group
+            ).values('title_id'))
+        return queryset
+
+    def filter_genre_match(self, queryset, name, value):
+        return queryset
+
+    def filter_decade(self, queryset, name, value):
+        start = value // 10 * 10
+        return queryset.filter(year__gte=start, year__lte=start + 9)
+
+    def filter_search(self, queryset, name, value):
+        return title_index.filter(queryset, value)
+
+
+class ReviewFilter(filters.FilterSet):
+    search = filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Review
+        fields = ('search',)
+
+    def filter_search(self, queryset, name, value):
+        title_id = self.request.parser_context['kwargs']['title_id']
+        return review_index.filter(queryset, value, title_id=int(title_id))
@@ -0,0 +1,181 @@
+import calendar
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import filters, relations, serializers, status
+from rest_framework.response import Response
+from reviews.catalog import catalog
+
+
+def get_model_field(model, name):
+    """Model field by name, reverse relations also by accessor name."""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+    return None
+
+
+def related_lookups(serializer, model, prefix='', in_prefetch=False):
+    """
+    Collects select_related and prefetch_related lookups
+    for the relations rendered by the serializer fields.
+    """
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        name = field.source.split('.')[0]
+        model_field = get_model_field(model, name)
+        if model_field is None or not model_field.is_relation:
+            continue
+        if name == getattr(model_field, 'attname', None) != model_field.name:
+            continue
+        lookup = f'{prefix}{name}'
+        if isinstance(field, serializers.ListSerializer):
+            field, many = field.child, True
+        elif isinstance(field, relations.ManyRelatedField):
+            field, many = field.child_relation, True
+        else:
+            many = model_field.many_to_many or model_field.one_to_many
+        if (isinstance(field, relations.PrimaryKeyRelatedField)
+                and not many):
+            continue
+        if many or in_prefetch:
+            prefetch.append(lookup)
+        else:
+            select.append(lookup)
+        if isinstance(field, serializers.BaseSerializer):
+            nested_select, nested_prefetch = related_lookups(
+                field, model_field.related_model, f'{lookup}__',
+                in_prefetch=many or in_prefetch
+            )
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+    return select, prefetch
+
+
+class QuerySetOptimizerMixin:
+    """
+    Joins or prefetches every relation rendered by the serializer,
+    so nested serializers and related fields don't issue a query per row.
+    """
+    _related_lookups = {}
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def get_related_lookups(self):
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._related_lookups:
+            serializer = serializer_class()
+            self._related_lookups[serializer_class] = related_lookups(
+                serializer, serializer.Meta.model
+            )
+        return self._related_lookups[serializer_class]
+
+    def optimize_queryset(self, queryset):
+        select, prefetch = self.get_related_lookups()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class CatalogListMixin:
+    """
+    Serves the list action from the in-process catalog cache,
+    `search` is applied in memory like SearchFilter does.
+    Set `catalog_list` to 'categories' or 'genres'.
+    """
+    catalog_list = None
+
+    def list(self, request, *args, **kwargs):
+        objects = getattr(catalog.get(), self.catalog_list)
+        terms = [term.casefold() for term
+                 in filters.SearchFilter().get_search_terms(request)]
+        if terms:
+            objects = [
+                obj for obj in objects
+                if all(
+                    any(term in str(getattr(obj, field)).casefold()
+                        for field in self.search_fields)
+                    for term in terms
+                )
+            ]
+        page = self.paginate_queryset(objects)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(objects, many=True).data)
+
+
+class ConditionalGetMixin:
+    """
+    Adds strong ETag and Last-Modified validators to list and retrieve
+    responses and answers matching conditional GETs with 304 Not Modified
+    before the queryset is evaluated or serialized.
+
+    `get_list_validator` and `get_object_validator` return a
+    (version, modified) pair the representation depends on, or None
+    to leave the request to the view, e.g. to answer 404.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validator(), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_object_validator(), super().retrieve,
+            request, *args, **kwargs
+        )
+
+    def get_list_validator(self):
+        return None
+
+    def get_object_validator(self):
+        return None
+
+    @staticmethod
+    def get_version(model, **lookups):
+        """(version, modified) of the matching object, None if missing."""
+        try:
+            return (model.objects.filter(**lookups)
+                    .values_list('version', 'modified').first())
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def get_etag(self, request, validator):
+        key = repr((
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT'),
+            validator,
+        ))
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def conditional_response(self, validator, view, request, *args,
+                             **kwargs):
+        if validator is None:
+            return view(request, *args, **kwargs)
+        etag = self.get_etag(request, validator)
+        modified = validator[1]
+        last_modified = (calendar.timegm(modified.utctimetuple())
+                         if modified else None)
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,192 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counts import CachedCountPaginator, count_cache_key
+
+# Cursor integers must fit 64-bit signed database integers.
+INTEGER_LIMIT = 2 ** 63
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    Page number pagination with cached, possibly estimated counts.
+    `count_exact` in the response tells whether `count` is exact.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cache_key = None
+        if hasattr(queryset, 'query'):
+            self.cache_key = count_cache_key(request, queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CachedCountPaginator(object_list, per_page,
+                                    cache_key=self.cache_key)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {'type': 'boolean'}
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination.
+
+    A page is selected by comparing the ordering key with the key of
+    the last row of the previous page instead of OFFSET, so deep pages
+    cost the same as the first one and concurrent inserts don't shift
+    the pages. Ordering must be unique: set `keyset_ordering` on the
+    view, e.g. ('id',) or ('pub_date', 'id').
+    """
+    cursor_query_param = 'cursor'
+    page_size = PageNumberPagination.page_size
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.model = queryset.model
+        reverse, position = self.decode_cursor(request)
+
+        order = [self.invert(field) if reverse else field
+                 for field in self.ordering]
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(order, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        first = self.get_key(results[0]) if results else position
+        last = self.get_key(results[-1]) if results else position
+        has_next, has_previous = (
+            (position is not None, has_more) if reverse
+            else (has_more, position is not None)
+        )
+        self.next_position = last if has_next else None
+        self.previous_position = first if has_previous else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(False, self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(True, self.previous_position)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_model_field(self, field):
+        name = field.lstrip('-')
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def get_key(self, instance):
+        return [getattr(instance, self.get_model_field(field).attname)
+                for field in self.ordering]
+
+    def keyset_filter(self, order, position):
+        """
+        Rows strictly after the position in the given order:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(order, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, reverse, position):
+        data = json.dumps([reverse, position], cls=DjangoJSONEncoder)
+        cursor = urlsafe_b64encode(data.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 PageNumberPagination.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return False, None
+        try:
+            reverse, values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [self.get_model_field(field).to_python(value)
+                        for field, value in zip(self.ordering, values)]
+            if any(isinstance(value, int)
+                   and not -INTEGER_LIMIT <= value < INTEGER_LIMIT
+                   for value in position):
+                raise ValueError
+        except (Base64Error, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+
+class PageNumberOrKeysetPagination(CachedCountPagination):
+    """
+    Page number pagination by default; requests with a `cursor`
+    parameter (`?cursor=` for the first page) are paginated
+    by KeysetPagination instead.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,167 @@
+"""
+Access token revocation.
+
+Issued access tokens are recorded with their expiration time; revoking
+the tokens of a user copies the unexpired ones to RevokedToken. Every
+worker keeps the revoked token ids in a Bloom filter and at most every
+TOKEN_REVOCATION_REFRESH_INTERVAL seconds loads the rows revoked since
+its last refresh minus TOKEN_REVOCATION_RELOAD_WINDOW seconds, so rows
+of transactions that committed late are still picked up. Checking
+a token that is not revoked is a memory probe. A positive probe may be
+false and is confirmed by the database.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, Iterator
+
+from django.conf import settings
+from django.utils import timezone
+from reviews.models import IssuedToken, RevokedToken, User
+from rest_framework_simplejwt.settings import api_settings
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(key))
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._loaded_at = None
+        # Rows of the reload window already in the filter, by id.
+        self._recent: Dict[int, datetime] = {}
+        self._checked_at = 0.0
+
+    def _new_filter(self, count: int) -> BloomFilter:
+        capacity = getattr(settings, 'TOKEN_REVOCATION_FILTER_CAPACITY',
+                           100000)
+        error_rate = getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', 0.01)
+        return BloomFilter(max(capacity, 2 * count), error_rate)
+
+    def _load(self, since=None) -> list:
+        rows = RevokedToken.objects.all()
+        if since is not None:
+            rows = rows.filter(revoked_at__gte=since)
+        return list(rows.values_list('id', 'jti', 'revoked_at'))
+
+    def refresh(self) -> None:
+        """
+        Loads tokens revoked by other workers. The filter is rebuilt
+        when it is over capacity, which also drops purged tokens.
+        """
+        interval = getattr(settings, 'TOKEN_REVOCATION_REFRESH_INTERVAL', 1)
+        window = timedelta(seconds=getattr(
+            settings, 'TOKEN_REVOCATION_RELOAD_WINDOW', 60
+        ))
+        with self._lock:
+            now = time.monotonic()
+            if self._filter is not None and now - self._checked_at < interval:
+                return
+            self._checked_at = now
+            loaded_at = timezone.now()
+            since = None
+            if self._filter is not None:
+                since = self._loaded_at - window
+                self._recent = {
+                    pk: revoked_at for pk, revoked_at in self._recent.items()
+                    if revoked_at >= since
+                }
+            rows = [row for row in self._load(since)
+                    if row[0] not in self._recent]
+            if (self._filter is not None
+                    and self._filter.count + len(rows)
+                    > self._filter.capacity):
+                self._filter = None
+                rows = self._load()
+            if self._filter is None:
+                self._filter = self._new_filter(len(rows))
+                self._recent = {}
+            for pk, jti, revoked_at in rows:
+                self._filter.add(jti)
+                if revoked_at >= loaded_at - window:
+                    self._recent[pk] = revoked_at
+            self._loaded_at = loaded_at
+
+    def add(self, jtis: Iterable[str]) -> None:
+        """Makes tokens revoked by this worker rejected at once."""
+        with self._lock:
+            if self._filter is not None:
+                for jti in jtis:
+                    self._filter.add(jti)
+
+    def is_revoked(self, jti) -> bool:
+        if not jti:
+            return False
+        self.refresh()
+        with self._lock:
+            if jti not in self._filter:
+                return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._recent = {}
+
+
+revocation_list = RevocationList()
+
+
+def expiration_time(token) -> datetime:
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def record_issued_token(user: User, token) -> None:
+    """Remembers the token to be able to revoke it until it expires."""
+    IssuedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    IssuedToken.objects.create(
+        jti=token[api_settings.JTI_CLAIM],
+        user=user,
+        expires_at=expiration_time(token)
+    )
+
+
+def revoke_user_tokens(user: User) -> int:
+    """Revokes the unexpired tokens of the user, returns their number."""
+    now = timezone.now()
+    tokens = list(
+        IssuedToken.objects.filter(user=user, expires_at__gt=now)
+        .values_list('jti', 'expires_at')
+    )
+    RevokedToken.objects.filter(expires_at__lte=now).delete()
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(jti=jti, expires_at=expires_at)
+         for jti, expires_at in tokens],
+        ignore_conflicts=True
+    )
+    revocation_list.add(jti for jti, _ in tokens)
+    return len(tokens)
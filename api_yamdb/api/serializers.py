@@ -1,41 +1,91 @@
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
-from reviews.models import Category, Comment, Genre, Review, Title, User
-
-
-class UserSerializer(serializers.ModelSerializer):
+from reviews.catalog import catalog
+from reviews.models import (MAX_SCORE, MIN_SCORE, Category, Comment, Genre,
+                            Review, Title, User)
+from reviews.ratings import score_distribution
+
+
+class UniqueConstraintMixin:
+    """
+    Leaves uniqueness checks to the database constraints instead of
+    querying before every write. The object is saved in a savepoint;
+    on IntegrityError the fields of `unique_errors` are checked to report
+    the conflict as a validation error. Single fields are reported as
+    field errors, groups of fields as non-field errors.
+    """
+    unique_errors = {}
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as error:
+            errors = self.get_unique_errors({**self.validated_data,
+                                             **kwargs})
+            if not errors:
+                raise
+            raise serializers.ValidationError(errors) from error
+
+    def get_unique_errors(self, data):
+        model = self.Meta.model
+        errors = {}
+        for fields, message in self.unique_errors.items():
+            lookups = {}
+            for name in fields:
+                attname = model._meta.get_field(name).attname
+                lookup = name if name in data else attname
+                lookups[lookup] = data.get(lookup)
+            if None in lookups.values():
+                continue
+            conflicts = model.objects.filter(**lookups)
+            if self.instance is not None:
+                conflicts = conflicts.exclude(pk=self.instance.pk)
+            if conflicts.exists():
+                key = (fields[0] if len(fields) == 1
+                       else api_settings.NON_FIELD_ERRORS_KEY)
+                errors.setdefault(key, []).append(message)
+        return errors
+
+
+class UserSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=150,
-        validators=(
-            UnicodeUsernameValidator(),
-            UniqueValidator(queryset=User.objects.all()),
-        ),
+        validators=(UnicodeUsernameValidator(),),
         required=True,
     )
+    unique_errors = {
+        ('username',): UniqueValidator.message,
+        ('email',): UniqueValidator.message,
+    }
 
     class Meta:
         fields = ('username', 'email', 'first_name',
                   'last_name', 'bio', 'role')
         model = User
+        extra_kwargs = {'email': {'validators': []}}
 
 
-class UserEditSerializer(serializers.ModelSerializer):
+class UserEditSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=150,
-        validators=(
-            UnicodeUsernameValidator(),
-            UniqueValidator(queryset=User.objects.all()),
-        ),
+        validators=(UnicodeUsernameValidator(),),
         required=True,
     )
     role = serializers.StringRelatedField(read_only=True)
+    unique_errors = UserSerializer.unique_errors
 
     class Meta:
         fields = ('username', 'email', 'bio', 'role',
                   'first_name', 'last_name')
         model = User
+        extra_kwargs = {'email': {'validators': []}}
 
 
 class RegisterDataSerializer(serializers.ModelSerializer):
@@ -54,17 +104,44 @@ class RegisterDataSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Username 'me' is not valid")
         return value
 
-    def validate(self, data):
-        user_if = User.objects.filter(username=data['username']).exists()
-        email_if = User.objects.filter(email=data['email']).exists()
-        if user_if:
-            if not email_if:
+    def find_user(self, data):
+        """
+        Looks up users by username or email in one query. Returns the
+        user with both, or raises the error for the taken one.
+        """
+        users = list(User.objects.filter(
+            Q(username=data['username']) | Q(email=data['email'])
+        )[:2])
+        wanted = (data['username'], data['email'])
+        for user in users:
+            if (user.username, user.email) == wanted:
+                return user
+        for user in users:
+            if user.username == data['username']:
                 raise serializers.ValidationError('Имя уже использовалось')
-        if email_if:
-            if not user_if:
-                raise serializers.ValidationError('Почта уже использовалось')
+            raise serializers.ValidationError('Почта уже использовалось')
+        return None
+
+    def validate(self, data):
+        self.user = self.find_user(data)
         return data
 
+    def create(self, validated_data):
+        """
+        Returns the existing user or creates one; a concurrent signup
+        with the same data is detected by the unique constraints.
+        """
+        if self.user is not None:
+            return self.user
+        try:
+            with transaction.atomic():
+                return User.objects.create(**validated_data)
+        except IntegrityError:
+            user = self.find_user(validated_data)
+            if user is None:
+                raise
+            return user
+
     class Meta:
         fields = ('username', 'email')
         model = User
@@ -79,36 +156,76 @@ class TokenSerializer(serializers.Serializer):
         model = User
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(UniqueConstraintMixin,
+                         serializers.ModelSerializer):
     name = serializers.CharField(max_length=256)
-    slug = serializers.SlugField(
-        max_length=50,
-        validators=(UniqueValidator(queryset=Category.objects.all()),)
-    )
+    slug = serializers.SlugField(max_length=50)
+    unique_errors = {('slug',): UniqueValidator.message}
 
     class Meta:
         model = Category
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
     name = serializers.CharField(max_length=256)
-    slug = serializers.SlugField(
-        max_length=50,
-        validators=(UniqueValidator(queryset=Genre.objects.all()),)
-    )
+    slug = serializers.SlugField(max_length=50)
+    unique_errors = {('slug',): UniqueValidator.message}
 
     class Meta:
         fields = ('name', 'slug')
         model = Genre
 
 
+class CatalogSlugRelatedField(serializers.SlugRelatedField):
+    """Resolves category or genre slugs from the catalog cache."""
+
+    def __init__(self, catalog_index, **kwargs):
+        self.catalog_index = catalog_index
+        super().__init__(slug_field='slug', **kwargs)
+
+    def to_internal_value(self, data):
+        found = catalog.lookup(self.catalog_index, str(data))
+        if found is None:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=smart_str(data))
+        return found
+
+
+class CatalogRelatedField(serializers.Field):
+    """
+    Renders a category or genres of a title from the catalog cache:
+    `category_id` or the prefetched `genretitle_set` is enough,
+    no join with the catalog tables is needed.
+    """
+
+    def __init__(self, serializer_class, catalog_index, many=False,
+                 **kwargs):
+        self.serializer_class = serializer_class
+        self.catalog_index = catalog_index
+        self.many = many
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not self.many:
+            return self.serializer_class(
+                catalog.lookup(self.catalog_index, value)
+            ).data
+        genres = sorted(
+            (catalog.lookup(self.catalog_index, link.genre_id)
+             for link in value.all()),
+            key=lambda genre: genre.pk
+        )
+        return self.serializer_class(genres, many=True).data
+
+
 class TitleCreateSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Category.objects.all(),
+    category = CatalogSlugRelatedField(
+        'category_by_slug', queryset=Category.objects.all(),
     )
-    genre = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Genre.objects.all(), many=True
+    genre = CatalogSlugRelatedField(
+        'genre_by_slug', queryset=Genre.objects.all(), many=True
     )
 
     class Meta:
@@ -127,48 +244,55 @@ class TitleCreateSerializer(serializers.ModelSerializer):
 
 
 class TitleSerializer(serializers.ModelSerializer):
-    category = CategorySerializer()
-    genre = GenreSerializer(read_only=True, many=True)
-    rating = serializers.IntegerField()
+    category = CatalogRelatedField(
+        CategorySerializer, 'category_by_id', source='category_id'
+    )
+    genre = CatalogRelatedField(
+        GenreSerializer, 'genre_by_id', many=True, source='genretitle_set'
+    )
+    rating = serializers.IntegerField(read_only=True)
+    score_distribution = serializers.SerializerMethodField()
 
     class Meta:
         model = Title
         fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category'
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category', 'score_distribution'
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        include = request.query_params.get('include', '') if request else ''
+        if 'score_distribution' not in include.split(','):
+            self.fields.pop('score_distribution')
 
-class ReviewSerializer(serializers.ModelSerializer):
+    def get_score_distribution(self, obj):
+        return score_distribution(obj)
+
+
+class ReviewSerializer(UniqueConstraintMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
 
+    unique_errors = {
+        ('author', 'title'): 'Отзыв можно оставить только один раз!',
+    }
+
     class Meta:
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
 
     def validate_score(self, score):
-        if score < 1 or 10 < score:
+        if score < MIN_SCORE or MAX_SCORE < score:
             raise serializers.ValidationError(
-                'Допустимые значения оценки - от 1 до 10!'
+                f'Допустимые значения оценки - от {MIN_SCORE} до {MAX_SCORE}!'
             )
         return score
 
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return data
-
-        title_id = self.context['view'].kwargs.get('title_id')
-        author = self.context['request'].user
-        if Review.objects.filter(
-                author=author, title=title_id).exists():
-            raise serializers.ValidationError(
-                'Отзыв можно оставить только один раз!'
-            )
-        return data
-
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
@@ -0,0 +1,46 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.versions import bump_version
+
+from .authentication import VERSION_NAME as AUTH_VERSION
+from .authentication import token_cache
+from .counts import bump_table_versions
+
+
+# Models read by paginated lists, writes to others (outbox, tokens,
+# versions) don't change any count.
+COUNTED_MODELS = (User, Category, Genre, Title, GenreTitle, Review, Comment)
+
+
+def bump_count_version(sender, **kwargs):
+    bump_table_versions((sender._meta.db_table,))
+
+
+def connect_count_invalidation():
+    """Invalidates cached list counts on writes to the listed models."""
+    for model in COUNTED_MODELS:
+        uid = f'count-version-{model._meta.label}'
+        post_save.connect(bump_count_version, sender=model, dispatch_uid=uid)
+        post_delete.connect(bump_count_version, sender=model,
+                            dispatch_uid=uid)
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(bump_count_version,
+                                sender=field.remote_field.through,
+                                dispatch_uid=uid)
+
+
+def outdate_tokens(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete or getattr(
+            instance, '_token_fields_changed', False):
+        bump_version(AUTH_VERSION)
+        token_cache.invalidate()
+
+
+def connect_token_invalidation():
+    """Makes workers recheck users whose token claims changed."""
+    post_save.connect(outdate_tokens, sender=User,
+                      dispatch_uid='outdate-tokens')
+    post_delete.connect(outdate_tokens, sender=User,
+                        dispatch_uid='outdate-tokens')
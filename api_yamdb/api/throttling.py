@@ -0,0 +1,181 @@
+"""
+Token bucket throttling with buckets shared by the workers of a host.
+
+A bucket holds up to `num` tokens of a 'num/period' rate and is refilled
+evenly over the period; a request takes one token. Rates are set in
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under '<scope>_<ident>' names,
+where the scope comes from the `throttle_scope` of the view and the
+ident from the throttle class, e.g. 'signup_ip' or 'signup_email'.
+Scopes without a rate are not throttled.
+
+Buckets live in a SQLite file (THROTTLE_STORE_PATH) opened by every
+worker process, a check is one primary key read and write.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+PRUNE_EVERY = 1000
+PRUNE_AGE = 24 * 60 * 60
+
+
+class BucketStore:
+    def __init__(self, path=None):
+        self._path = path
+        self._local = threading.local()
+        self._consumed = 0
+
+    @property
+    def path(self):
+        return self._path or getattr(
+            settings, 'THROTTLE_STORE_PATH',
+            os.path.join(settings.BASE_DIR, 'throttle.sqlite3')
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """A connection per thread, reopened in forked processes."""
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL) WITHOUT ROWID'
+            )
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def consume(self, key: str, capacity: int, rate: float) -> float:
+        """
+        Takes a token from the bucket. Returns 0 on success, otherwise
+        the seconds until a token is available.
+        """
+        now = time.time()
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = capacity if row is None else min(
+                capacity, row[0] + max(now - row[1], 0) * rate
+            )
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._consumed += 1
+        if self._consumed % PRUNE_EVERY == 0:
+            self.prune(now - PRUNE_AGE)
+        return wait
+
+    def prune(self, updated_before: float) -> None:
+        """Drops buckets untouched long enough to be full again."""
+        self.connection.execute(
+            'DELETE FROM buckets WHERE updated < ?', (updated_before,)
+        )
+
+    def clear(self) -> None:
+        self.connection.execute('DELETE FROM buckets')
+
+
+bucket_store = BucketStore()
+
+
+def throttle_scope(scope):
+    """Sets `throttle_scope` of a function based view made by api_view."""
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles by client IP; subclasses change `ident`."""
+    ident = 'ip'
+    safe_methods = True
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+    def get_rate(self, scope):
+        """(requests, seconds) of the '<scope>_<ident>' rate."""
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(
+            f'{scope}_{self.ident}'
+        )
+        if rate is None:
+            return None, None
+        num, period = rate.split('/')
+        return int(num), PERIODS[period[0]]
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope or (not self.safe_methods
+                         and request.method in SAFE_METHODS):
+            return True
+        num_requests, duration = self.get_rate(scope)
+        value = self.get_ident_value(request)
+        if num_requests is None or value is None:
+            return True
+        self.wait_time = bucket_store.consume(
+            f'{scope}:{self.ident}:{value}',
+            num_requests,
+            num_requests / duration
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class DataFieldThrottle(TokenBucketThrottle):
+    """Throttles by a case-insensitive request data field."""
+
+    def get_ident_value(self, request):
+        if not isinstance(request.data, Mapping):
+            return None
+        value = request.data.get(self.ident)
+        if not value or not isinstance(value, str):
+            return None
+        return value.casefold()
+
+
+class EmailThrottle(DataFieldThrottle):
+    ident = 'email'
+
+
+class UsernameThrottle(DataFieldThrottle):
+    ident = 'username'
+
+
+class UserWriteThrottle(TokenBucketThrottle):
+    """Throttles unsafe requests by user, anonymous ones by IP."""
+    ident = 'user'
+    safe_methods = False
+
+    def get_ident_value(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
@@ -1,27 +1,36 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMessage
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg
-from django.conf import settings
+from django.db import transaction
 from rest_framework import filters, permissions, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from reviews.models import Category, Genre, Review, Title, User
-from .filters import TitleFilter
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.outbox import queue_email
+from .authentication import access_token_for
+from .counts import table_validator
+from .filters import ReviewFilter, TitleFilter
+from .mixins import (CatalogListMixin, ConditionalGetMixin,
+                     QuerySetOptimizerMixin)
+from .pagination import PageNumberOrKeysetPagination
 from .permissions import (AdminModeratorAuthorOrReadOnly, AdminOnly,
                           AdminOrReadOnly)
+from .revocation import record_issued_token, revoke_user_tokens
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, RegisterDataSerializer,
                           ReviewSerializer, TitleCreateSerializer,
                           TitleSerializer, TokenSerializer, UserEditSerializer,
                           UserSerializer)
+from .throttling import (EmailThrottle, TokenBucketThrottle,
+                         UsernameThrottle, UserWriteThrottle, throttle_scope)
 from .viewsets import CreateListDestroyViewSet
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(QuerySetOptimizerMixin, ModelViewSet):
     lookup_field = 'username'
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -29,6 +38,19 @@ class UserViewSet(ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['username']
     http_method_names = ['get', 'post', 'delete', 'patch']
+    role_ranks = {User.USER: 0, User.MODERATOR: 1, User.ADMIN: 2}
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        role = serializer.instance.role
+        user = serializer.save()
+        if self.role_ranks[user.role] < self.role_ranks[role]:
+            revoke_user_tokens(user)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        revoke_user_tokens(instance)
+        instance.delete()
 
     @action(
         methods=[
@@ -41,7 +63,8 @@ class UserViewSet(ModelViewSet):
         serializer_class=UserEditSerializer,
     )
     def users_own_profile(self, request):
-        user = request.user
+        # request.user may be built from the token claims only.
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -58,24 +81,23 @@ class UserViewSet(ModelViewSet):
 
 
 def send_email(data):
-    email = EmailMessage(
+    """Queues the email, it is delivered by the send_outbox command."""
+    queue_email(
         subject=data['mail_subject'],
         body=data['email_info'],
-        from_email=settings.EMAIL_ADMIN,
         to=[data['to_email']]
     )
-    email.send()
 
 
+@throttle_scope('signup')
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([TokenBucketThrottle, EmailThrottle, UsernameThrottle])
+@transaction.atomic
 def register(request):
     serializer = RegisterDataSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    user, created = User.objects.get_or_create(
-        username=serializer.validated_data['username'],
-        email=serializer.validated_data['email'],
-    )
+    user = serializer.save()
     confirmation_code = default_token_generator.make_token(user)
     email_text = (
         f'Код подтверждения {confirmation_code}')
@@ -89,8 +111,10 @@ def register(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@throttle_scope('token')
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([TokenBucketThrottle, UsernameThrottle])
 def get_jwt_token(request):
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -102,14 +126,16 @@ def get_jwt_token(request):
     if user.confirmation_code == serializer.validated_data.get(
             'confirmation_code'
     ):
-        token = RefreshToken.for_user(user).access_token
+        token = access_token_for(user)
+        record_issued_token(user, token)
         return Response({'token': str(token)},
                         status=status.HTTP_201_CREATED)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(CatalogListMixin, CreateListDestroyViewSet):
+    catalog_list = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (AdminOrReadOnly,)
@@ -118,7 +144,8 @@ class CategoryViewSet(CreateListDestroyViewSet):
     search_fields = ('name',)
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(CatalogListMixin, CreateListDestroyViewSet):
+    catalog_list = 'genres'
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (AdminOrReadOnly,)
@@ -127,12 +154,25 @@ class GenreViewSet(CreateListDestroyViewSet):
     search_fields = ('name',)
 
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('id').all()
+class TitleViewSet(ConditionalGetMixin, QuerySetOptimizerMixin,
+                   ModelViewSet):
+    queryset = Title.objects.all()
     serializer_class = TitleSerializer
     permission_classes = (AdminOrReadOnly,)
     filterset_class = TitleFilter
+    pagination_class = PageNumberOrKeysetPagination
+
+    # Tables the list is filtered and rendered from, ratings included.
+    list_tables = tuple(model._meta.db_table for model in (
+        Title, GenreTitle, Genre, Category, Review
+    ))
+
+    def get_list_validator(self):
+        """Table versions, any write to the tables changes the list."""
+        return table_validator(self.list_tables)
+
+    def get_object_validator(self):
+        return self.get_version(Title, pk=self.kwargs.get('pk'))
 
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH',):
@@ -140,40 +180,93 @@ class TitleViewSet(ModelViewSet):
         return TitleSerializer
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, QuerySetOptimizerMixin,
+                    ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (AdminModeratorAuthorOrReadOnly, )
+    pagination_class = PageNumberOrKeysetPagination
+    filterset_class = ReviewFilter
+    throttle_classes = (UserWriteThrottle,)
+    throttle_scope = 'reviews'
+
+    def get_list_validator(self):
+        """The title version, also answers 404 for a missing title."""
+        version = self.get_version(Title, pk=self.kwargs.get('title_id'))
+        if version is None:
+            raise Http404
+        return version
+
+    def get_object_validator(self):
+        return self.get_version(
+            Review,
+            pk=self.kwargs.get('pk'),
+            title_id=self.kwargs.get('title_id')
+        )
 
     def get_queryset(self):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
+        return self.optimize_queryset(
+            Review.objects.filter(title_id=self.kwargs.get('title_id'))
         )
-        return title.reviews.all()
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        """
+        The title is locked until commit: the rating update writes it
+        anyway, and it can't be deleted before the review is saved.
+        """
+        if not Title.objects.select_for_update().filter(
+                pk=self.kwargs.get('title_id')).exists():
+            raise Http404
+        serializer.save(author=self.request.user,
+                        title_id=self.kwargs.get('title_id'))
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
 
-class CommentViewSet(ModelViewSet):
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+
+class CommentViewSet(ConditionalGetMixin, QuerySetOptimizerMixin,
+                     ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (AdminModeratorAuthorOrReadOnly, )
+    pagination_class = PageNumberOrKeysetPagination
+    throttle_classes = (UserWriteThrottle,)
+    throttle_scope = 'comments'
 
-    def get_queryset(self):
-        review = get_object_or_404(
+    def get_list_validator(self):
+        """The review version, also answers 404 for a missing review."""
+        version = self.get_version(
             Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id')
         )
-        return review.comments.all()
+        if version is None:
+            raise Http404
+        return version
 
-    def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
+    def get_object_validator(self):
+        return self.get_version(
+            Comment,
+            pk=self.kwargs.get('pk'),
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
         )
-        serializer.save(author=self.request.user, review=review)
+
+    def get_queryset(self):
+        return self.optimize_queryset(Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ))
+
+    def perform_create(self, serializer):
+        # The foreign key can't tell whether the review is of the title.
+        if not Review.objects.filter(
+                pk=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')).exists():
+            raise Http404
+        serializer.save(author=self.request.user,
+                        review_id=self.kwargs.get('review_id'))
@@ -106,10 +106,24 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 EMAIL_ADMIN = 'admin@ya.ru'
 
+# Emails are queued in the outbox and delivered by `send_outbox`:
+# messages per batch, attempts before a message is marked dead, the
+# retry delay in seconds, doubled after each failed attempt, and how long,
+# in seconds, a batch being sent is hidden from other workers.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 3600
+EMAIL_OUTBOX_LEASE = 300
+
+# Bayesian title rating: the prior mean score and its weight in reviews.
+RATING_PRIOR_MEAN = 5.5
+RATING_PRIOR_WEIGHT = 10
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -117,10 +131,51 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 5,
+    # Token bucket rates per '<view throttle_scope>_<ident>', see
+    # api.throttling; scopes without a rate are not throttled.
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '20/hour',
+        'signup_email': '5/hour',
+        'signup_username': '5/hour',
+        'token_ip': '30/hour',
+        'token_username': '10/hour',
+        'reviews_user': '30/minute',
+        'comments_user': '60/minute',
+    },
 }
 
+# SQLite file with the throttling buckets shared by the workers of
+# this deployment.
+THROTTLE_STORE_PATH = os.getenv(
+    'THROTTLE_STORE_PATH',
+    default=os.path.join(BASE_DIR, 'throttle.sqlite3'))
+
+# List counts are cached per endpoint and filters until a write to one
+# of the counted tables; above the limit they are estimated.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+PAGINATION_EXACT_COUNT_LIMIT = 10000
+
+# How often, in seconds, a worker compares its in-process catalog
+# (categories and genres) with the version stored in the database.
+CATALOG_CACHE_CHECK_INTERVAL = 1
+
+# Validated access tokens kept per worker, and how often, in seconds,
+# a worker checks whether token claims of some user have changed.
+JWT_AUTH_CACHE_SIZE = 1024
+JWT_AUTH_CHECK_INTERVAL = 1
+
+# Revoked access tokens are kept per worker in a Bloom filter sized for
+# the capacity with the given false positive rate; new revocations are
+# loaded at most every refresh interval, in seconds. Each refresh also
+# rereads the revocations of the preceding reload window, in seconds,
+# which must be longer than any transaction revoking tokens.
+TOKEN_REVOCATION_FILTER_CAPACITY = 100000
+TOKEN_REVOCATION_ERROR_RATE = 0.01
+TOKEN_REVOCATION_REFRESH_INTERVAL = 1
+TOKEN_REVOCATION_RELOAD_WINDOW = 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -0,0 +1,86 @@
+"""
+In-process cache of the category and genre catalog.
+
+Both tables are tiny and rarely change, so every worker keeps them in
+memory. Writes bump the `catalog` CacheVersion; a worker compares the
+stored version with its own at most every CATALOG_CACHE_CHECK_INTERVAL
+seconds, or right away on a lookup miss, and reloads the catalog when
+they differ. Writes made by the worker itself invalidate its cache
+immediately.
+"""
+import threading
+import time
+from typing import Dict, List
+
+from django.conf import settings
+
+from .models import Category, Genre
+from .versions import get_version
+
+VERSION_NAME = 'catalog'
+
+
+class CatalogData:
+    def __init__(self, categories: List[Category], genres: List[Genre]):
+        self.categories = categories
+        self.genres = genres
+        self.category_by_id: Dict[int, Category] = {
+            category.pk: category for category in categories
+        }
+        self.category_by_slug: Dict[str, Category] = {
+            category.slug: category for category in categories
+        }
+        self.genre_by_id: Dict[int, Genre] = {
+            genre.pk: genre for genre in genres
+        }
+        self.genre_by_slug: Dict[str, Genre] = {
+            genre.slug: genre for genre in genres
+        }
+
+
+class Catalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self, recheck: bool = False) -> CatalogData:
+        """
+        The cached catalog, its version is checked when the interval
+        has passed or `recheck` is set, and the catalog is reloaded
+        only when the stored version differs.
+        """
+        interval = getattr(settings, 'CATALOG_CACHE_CHECK_INTERVAL', 1)
+        with self._lock:
+            now = time.monotonic()
+            if (self._data is None or recheck
+                    or now - self._checked_at >= interval):
+                version = get_version(VERSION_NAME)
+                if self._data is None or version != self._version:
+                    self._data = CatalogData(
+                        list(Category.objects.order_by('id')),
+                        list(Genre.objects.order_by('id'))
+                    )
+                    self._version = version
+                self._checked_at = now
+            return self._data
+
+    def lookup(self, index: str, key):
+        """
+        Catalog object by key from one of the CatalogData indexes.
+        A miss may mean the cache is stale, so the stored version is
+        checked once; unknown keys (e.g. client typos) don't reload
+        an up to date catalog.
+        """
+        found = getattr(self.get(), index).get(key)
+        if found is None:
+            found = getattr(self.get(recheck=True), index).get(key)
+        return found
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+
+
+catalog = Catalog()
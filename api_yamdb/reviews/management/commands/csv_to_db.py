@@ -1,35 +1,638 @@
-from typing import Any, Optional, Dict, List
 import csv
+import hashlib
+import multiprocessing
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-import logging
+from queue import Empty
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Set)
 
-from django.core.management.base import BaseCommand, CommandParser
+import django
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Field, Q
+from django.utils import timezone
 
+from api.authentication import VERSION_NAME as AUTH_VERSION
+from api.counts import bump_table_versions
+from reviews.catalog import VERSION_NAME as CATALOG_VERSION
 from reviews.models import (User, Category, Genre, Title,
-                            GenreTitle, Review, Comment)
+                            GenreTitle, Review, Comment, CsvImport,
+                            CsvImportRow)
+from reviews.ratings import rebuild_ratings
+from reviews.search import review_index, title_index
+from reviews.versions import bump_version, touch
 
 
-logger = logging.getLogger(__name__)
+QUEUE_BATCHES = 4
+
+RowSource = Callable[[str], Iterable[Dict[str, Any]]]
+
+
+def file_checksum(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_checksum(row: Dict[str, str]) -> str:
+    data = '\x1f'.join(f'{key}\x1e{value}' for key, value in row.items())
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def parse_table(path: Path, table: str, batch_size: int,
+                incremental: bool, queue) -> None:
+    """
+    Runs in a worker process: puts the parsed batches of the table
+    to the queue, then None. A CommandError is put instead of a batch.
+    """
+    loader = CsvToDb(path, batch_size, incremental=incremental)
+    try:
+        for batch in loader.parse_batches(table):
+            queue.put(batch)
+    except CommandError as error:
+        queue.put(error)
+    queue.put(None)
 
 
 class CsvToDb:
     """
-    To add a new model, write the csv_to_model_name method.
-    The order of the methods is important,
-    tables will be added in this order.
+    To add a new model, write the csv_to_model_name method converting
+    a csv row to an unsaved instance, foreign keys are set by id,
+    and add the model to `models` and its csv layout to `columns`.
+    A table is loaded after the tables its model references.
+
+    Rows are streamed and inserted with bulk_create, one transaction
+    per batch; rows with existing ids are skipped. Model signals are not
+    sent, so ratings, search indexes and the catalog cache are rebuilt
+    after the load.
+
+    With several jobs the files are parsed and validated by a process
+    pool, all tables at once, while this process writes the batches
+    table by table in dependency order.
+
+    Fast mode is meant for initial loads into empty tables: constraint
+    and index work is deferred to the end of the load, which runs in one
+    transaction committed only if the data passes verification.
+
+    In incremental mode rows are upserted by id instead. The checksum
+    of the file is kept in CsvImport and the checksum of every row in
+    CsvImportRow: an unchanged file is skipped, otherwise only the rows
+    whose checksum changed are written, batch by batch, and rows removed
+    from the file since the previous import may be deleted. Only objects
+    depending on the written rows are refreshed afterwards.
     """
 
-    def parse_tables(tables: List[str], path: str) -> None:
+    models = {
+        'users': User,
+        'category': Category,
+        'genre': Genre,
+        'titles': Title,
+        'genre_title': GenreTitle,
+        'review': Review,
+        'comments': Comment,
+    }
+    # Columns of the csv files, db_to_csv writes them in this order.
+    columns = {
+        'users': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                  'last_name'),
+        'category': ('id', 'name', 'slug'),
+        'genre': ('id', 'name', 'slug'),
+        'titles': ('id', 'name', 'year', 'description', 'category'),
+        'genre_title': ('id', 'title_id', 'genre_id'),
+        'review': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        'comments': ('id', 'review_id', 'text', 'author', 'pub_date'),
+    }
+    # Foreign keys to objects refreshed when a row changes.
+    parents = {
+        'genre_title': 'title_id',
+        'review': 'title_id',
+        'comments': 'review_id',
+    }
+
+    def __init__(self, path: Path, batch_size: int = 1000, stdout=None,
+                 incremental: bool = False, delete_missing: bool = False,
+                 jobs: int = 1, fast: bool = False):
+        self.path = path
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.incremental = incremental
+        self.delete_missing = delete_missing
+        self.jobs = jobs
+        self.fast = fast
+        self.checksums = {}
+        self.changed = defaultdict(set)
+        self.changed_parents = defaultdict(set)
+
+    def read_rows(self, table: str) -> Iterator[Dict[str, str]]:
+        file_path = Path(self.path, f'{table}.csv')
+        with open(file_path, encoding='utf-8-sig', newline='') as fp:
+            yield from csv.DictReader(fp, delimiter=',', quotechar='"')
+
+    def read_columns(self, table: str) -> List[str]:
+        file_path = Path(self.path, f'{table}.csv')
+        with open(file_path, encoding='utf-8-sig', newline='') as fp:
+            return next(csv.reader(fp, delimiter=',', quotechar='"'), [])
+
+    def parse_batches(self, table: str,
+                      rows: Optional[Iterable[Dict[str, str]]] = None
+                      ) -> Iterator[List[tuple]]:
+        """
+        Converts and validates the rows of the table, read from its file
+        unless given. Yields batches of (id, row checksum, field values
+        by attname) tuples, the checksum is only computed in incremental
+        mode.
+        """
+        model = self.models[table]
+        convert = getattr(self, f'csv_to_{table}')
+        if rows is None:
+            rows = self.read_rows(table)
+            names = self.read_columns(table)
+        else:
+            names = self.columns[table]
+        try:
+            columns = {model._meta.get_field(column) for column in names}
+        except FieldDoesNotExist as error:
+            raise CommandError(f'{table}.csv: {error}')
+        batch = []
+        for number, row in enumerate(rows, 1):
+            try:
+                values = self.clean(model, convert(row), columns)
+            except (KeyError, TypeError, ValueError,
+                    ValidationError) as error:
+                raise CommandError(f'{table}.csv, row {number}: {error}')
+            checksum = row_checksum(row) if self.incremental else ''
+            batch.append((row['id'], checksum, values))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def clean(model, instance, columns: Set[Field]) -> Dict[str, Any]:
+        """
+        Returns the field values of the instance. Non-empty values of
+        the csv columns are validated, empty ones are loaded as they are
+        (e.g. titles without a description); foreign keys are only
+        converted, their targets are checked by the database.
+        """
+        values = {}
+        for field in model._meta.concrete_fields:
+            value = getattr(instance, field.attname)
+            if field.is_relation:
+                value = field.target_field.to_python(value)
+            elif field in columns and value not in field.empty_values:
+                value = field.clean(value, instance)
+            values[field.attname] = value
+        return values
+
+    def parse_tables(self, tables: List[str],
+                     rows: Optional[RowSource] = None) -> None:
+        """
+        Loads the tables from their files, or from `rows(table)`
+        iterables of csv-like rows when given.
+        """
+        pending = [table for table in tables if not self.is_unchanged(table)]
+        if self.fast:
+            with self.deferred_checks(pending):
+                self.load_tables(pending, rows)
+        else:
+            self.load_tables(pending, rows)
+        self.after_load(tables)
+
+    def load_tables(self, tables: List[str],
+                    rows: Optional[RowSource] = None) -> None:
+        jobs = min(self.jobs, len(tables))
+        if jobs > 1 and rows is None:
+            # The manager is shut down first when loading fails,
+            # which makes workers blocked on full queues exit.
+            with ProcessPoolExecutor(jobs, initializer=django.setup) as pool, \
+                    multiprocessing.Manager() as manager:
+                parsed = []
+                for table in tables:
+                    queue = manager.Queue(QUEUE_BATCHES)
+                    future = pool.submit(
+                        parse_table, self.path, table, self.batch_size,
+                        self.incremental, queue
+                    )
+                    parsed.append((table, queue, future))
+                for table, queue, future in parsed:
+                    self.load_table(table, self.receive(queue, future))
+        else:
+            for table in tables:
+                self.load_table(table, self.parse_batches(
+                    table, rows(table) if rows is not None else None
+                ))
+
+    @contextmanager
+    def deferred_checks(self, tables: List[str]) -> Iterator[None]:
+        """
+        Fast mode, for empty tables only: the load runs in one transaction
+        without foreign key checks and is verified before it commits, so
+        a load failing verification leaves nothing behind. On SQLite
+        secondary indexes of the tables are dropped in the transaction
+        and created again at the end, a failed load restores them.
+        """
+        filled = [table for table in tables
+                  if self.models[table].objects.exists()]
+        if filled:
+            raise CommandError(
+                f'--fast loads into empty tables only, {", ".join(filled)} '
+                'already have rows.'
+            )
+        db_tables = [self.models[table]._meta.db_table for table in tables]
+        indexes = []
+        with self.relaxed_journal(), \
+                connection.constraint_checks_disabled(), \
+                transaction.atomic():
+            if connection.vendor == 'sqlite' and tables:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT name, sql FROM sqlite_master "
+                        "WHERE type = 'index' AND sql IS NOT NULL "
+                        'AND sql NOT LIKE %s AND tbl_name IN '
+                        f'({", ".join(["%s"] * len(db_tables))})',
+                        ['CREATE UNIQUE %', *db_tables]
+                    )
+                    indexes = cursor.fetchall()
+                    for name, _ in indexes:
+                        cursor.execute(
+                            f'DROP INDEX {connection.ops.quote_name(name)}'
+                        )
+            yield
+            with connection.cursor() as cursor:
+                for _, sql in indexes:
+                    cursor.execute(sql)
+            problems = self.verify(tables)
+            if problems:
+                raise CommandError(
+                    'Loaded data failed verification, nothing was saved:\n'
+                    + '\n'.join(problems)
+                )
+
+    @staticmethod
+    @contextmanager
+    def relaxed_journal() -> Iterator[None]:
+        """
+        On SQLite the journal of the fast load is kept in memory and not
+        synced to disk, the previous modes are restored afterwards.
+        An error still rolls the load back, but a crash of the process
+        or the machine during the load may corrupt the database file.
+        """
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            yield
+            return
+        pragmas = {}
+        with connection.cursor() as cursor:
+            for name in ('journal_mode', 'synchronous'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+            cursor.execute('PRAGMA synchronous = OFF')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name} = {value}')
+
+    def verify(self, tables: List[str]) -> List[str]:
+        """
+        Runs the database integrity check and looks for rows of the
+        tables referencing missing objects. Returns the problems found.
+        """
+        problems = []
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA integrity_check')
+                problems += [row[0] for row in cursor.fetchall()
+                             if row[0] != 'ok']
         for table in tables:
-            file_path = Path(path, f'{table}.csv')
-            with open(file_path, encoding='utf-8-sig') as fp:
-                reader = csv.reader(fp, delimiter=",", quotechar='"')
-                headers = next(reader, None)
-                data = [
-                    {header: row[i] for i, header in enumerate(headers)}
-                    for row in reader]
-                getattr(CsvToDb, f'csv_to_{table}')(data)
+            model = self.models[table]
+            for field in model._meta.concrete_fields:
+                if not field.is_relation:
+                    continue
+                orphans = model.objects.filter(
+                    **{f'{field.attname}__isnull': False}
+                ).exclude(**{
+                    f'{field.attname}__in': field.related_model.objects
+                    .values(field.target_field.attname)
+                })
+                count = orphans.count()
+                if count:
+                    ids = list(orphans.order_by('pk')
+                               .values_list('pk', flat=True)[:5])
+                    problems.append(
+                        f'{table}: {count} rows reference a missing '
+                        f'{field.name}, e.g. ids {ids}'
+                    )
+        return problems
+
+    @staticmethod
+    def receive(queue, future) -> Iterator[List[tuple]]:
+        """Yields the batches a worker puts to the queue."""
+        while True:
+            try:
+                batch = queue.get(timeout=1)
+            except Empty:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+                continue
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+
+    def is_unchanged(self, table: str) -> bool:
+        """
+        In incremental mode remembers the file checksum,
+        reports files unchanged since the previous import.
+        """
+        if not self.incremental:
+            return False
+        checksum = file_checksum(Path(self.path, f'{table}.csv'))
+        state = CsvImport.objects.filter(table=table).first()
+        if state is not None and state.checksum == checksum:
+            if self.stdout is not None:
+                self.stdout.write(f'{table}: unchanged')
+            return True
+        self.checksums[table] = checksum
+        return False
+
+    def load_table(self, table: str, batches: Iterable[List[tuple]]) -> int:
+        """
+        Writes the parsed batches, returns the number of inserted rows.
+        Rows skipped as conflicting with existing ones are not counted.
+        """
+        if self.incremental:
+            return self.sync_table(table, batches)
+        model = self.models[table]
+        started = time.monotonic()
+        total = skipped = 0
+        for batch in batches:
+            pks = [values[model._meta.pk.attname] for _, _, values in batch]
+            stored = model.objects.filter(pk__in=pks)
+            try:
+                with transaction.atomic():
+                    existing = stored.count()
+                    self.bulk_insert(
+                        model, [model(**values) for _, _, values in batch],
+                        ignore_conflicts=True
+                    )
+                    inserted = stored.count() - existing
+            except IntegrityError as error:
+                raise CommandError(
+                    f'{table}.csv, ids {pks[0]}-{pks[-1]}: {error}'
+                    + ''.join(f'\n{problem}' for problem
+                              in self.missing_references(table, batch))
+                ) from error
+            total += inserted
+            skipped += len(batch) - inserted
+        self.report(table, total, time.monotonic() - started, skipped)
+        return total
+
+    @staticmethod
+    def bulk_insert(model, instances: List, **options) -> None:
+        """
+        bulk_create keeping the values of auto_now fields (e.g. pub_date),
+        which their pre_save would replace with the current time; empty
+        values get the current time. The flags are switched off for the
+        duration of the insert, the command writes from one thread.
+        """
+        fields = [field for field in model._meta.concrete_fields
+                  if getattr(field, 'auto_now', False)
+                  or getattr(field, 'auto_now_add', False)]
+        now = timezone.now()
+        for instance in instances:
+            for field in fields:
+                if getattr(instance, field.attname) is None:
+                    setattr(instance, field.attname, now)
+        flags = [(field.auto_now, field.auto_now_add) for field in fields]
+        try:
+            for field in fields:
+                field.auto_now = field.auto_now_add = False
+            model.objects.bulk_create(instances, **options)
+        finally:
+            for field, (auto_now, auto_now_add) in zip(fields, flags):
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+    def missing_references(self, table: str,
+                           batch: List[tuple]) -> List[str]:
+        """Describes the rows of the batch referencing missing objects."""
+        model = self.models[table]
+        problems = []
+        for field in model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            targets = {values[field.attname] for _, _, values in batch}
+            found = set(field.related_model.objects.filter(**{
+                f'{field.target_field.attname}__in': targets
+            }).values_list(field.target_field.attname, flat=True))
+            problems += [
+                f'id {key} references a missing {field.name} '
+                f'{values[field.attname]}'
+                for key, _, values in batch
+                if values[field.attname] is not None
+                and values[field.attname] not in found
+            ]
+        return problems
+
+    def sync_table(self, table: str, batches: Iterable[List[tuple]]) -> int:
+        """
+        Upserts the rows changed since the previous import,
+        returns the number of written and deleted rows.
+        Rows found in the file are marked with the number of this
+        import, rows left with an older number were removed from it.
+        """
+        started = time.monotonic()
+        state, _ = CsvImport.objects.get_or_create(table=table)
+        generation = state.generation + 1
+        fields = [self.models[table]._meta.get_field(column).name
+                  for column in self.read_columns(table) if column != 'id']
+        total = 0
+        for batch in batches:
+            total += self.sync_batch(table, batch, fields, generation)
+        missing = CsvImportRow.objects.filter(table=table,
+                                              generation__lt=generation)
+        if self.delete_missing:
+            while True:
+                pks = list(missing.order_by('row_id')
+                           .values_list('row_id', flat=True)[:self.batch_size])
+                if not pks:
+                    break
+                total += self.delete(table, pks)
+                missing.filter(row_id__in=pks).delete()
+        else:
+            # Kept to be deleted by a later import, rewritten if back.
+            missing.update(checksum='')
+        state.checksum = self.checksums[table]
+        state.generation = generation
+        state.save()
+        self.report(table, total, time.monotonic() - started)
+        return total
+
+    def sync_batch(self, table: str, batch: List[tuple], fields: List[str],
+                   generation: int) -> int:
+        """
+        Upserts the rows of the batch whose checksum changed and stores
+        the checksums in one transaction, returns the number of rows
+        written.
+        """
+        keys = [key for key, _, _ in batch]
+        tracked = CsvImportRow.objects.filter(table=table)
+        try:
+            with transaction.atomic():
+                previous = dict(tracked.filter(row_id__in=keys)
+                                .values_list('row_id', 'checksum'))
+                changed = [(key, checksum, values)
+                           for key, checksum, values in batch
+                           if previous.get(key) != checksum]
+                self.upsert(table, [values for _, _, values in changed],
+                            fields)
+                tracked.filter(row_id__in=keys).exclude(
+                    row_id__in=[key for key, _, _ in changed]
+                ).update(generation=generation)
+                tracked.filter(
+                    row_id__in=[key for key, _, _ in changed]
+                ).delete()
+                CsvImportRow.objects.bulk_create(
+                    CsvImportRow(table=table, row_id=key, checksum=checksum,
+                                 generation=generation)
+                    for key, checksum, _ in changed
+                )
+        except IntegrityError as error:
+            # E.g. two rows swapping a unique value, or a missing parent.
+            raise CommandError(
+                f'{table}.csv, ids {keys[0]}-{keys[-1]}: {error}'
+            ) from error
+        return len(changed)
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]],
+               fields: List[str]) -> int:
+        """Creates or updates the rows in one transaction."""
+        if not rows:
+            return 0
+        model = self.models[table]
+        instances = [model(**values) for values in rows]
+        parent = self.parents.get(table)
+        with transaction.atomic():
+            existing = model.objects.filter(
+                pk__in=[instance.pk for instance in instances]
+            )
+            if parent is not None:
+                self.changed_parents[table].update(
+                    existing.values_list(parent, flat=True)
+                )
+            existing = set(existing.values_list('pk', flat=True))
+            self.bulk_insert(model, [instance for instance in instances
+                                     if instance.pk not in existing])
+            model.objects.bulk_update(
+                [instance for instance in instances
+                 if instance.pk in existing],
+                fields
+            )
+        self.changed[table].update(instance.pk for instance in instances)
+        if parent is not None:
+            self.changed_parents[table].update(
+                getattr(instance, parent) for instance in instances
+            )
+        return len(instances)
+
+    def delete(self, table: str, pks: List[str]) -> int:
+        """
+        Deletes rows by id. Deletion sends model signals,
+        so dependent objects are kept up to date as usual.
+        """
+        model = self.models[table]
+        total = 0
+        for batch in self.batches(pks):
+            with transaction.atomic():
+                _, deleted = model.objects.filter(pk__in=batch).delete()
+            total += deleted.get(model._meta.label, 0)
+        return total
+
+    def batches(self, items: Iterable) -> Iterator[List]:
+        items = iter(items)
+        while True:
+            batch = list(islice(items, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def report(self, table: str, total: int, seconds: float,
+               skipped: int = 0) -> None:
+        if self.stdout is not None:
+            self.stdout.write(
+                f'{table}: {total} rows in {seconds:.2f}s '
+                f'({total / max(seconds, 1e-6):.0f} rows/s)'
+                + (f', {skipped} existing skipped' if skipped else '')
+            )
+
+    def after_load(self, tables: List[str]) -> None:
+        """Restores what the model signals maintain on regular writes."""
+        models = [self.models[table] for table in tables]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        bump_table_versions(model._meta.db_table for model in models)
+        if self.incremental:
+            self.refresh_changed()
+            return
+        if {'category', 'genre'} & set(tables):
+            bump_version(CATALOG_VERSION)
+        # Titles are loaded before their reviews, so only a review load
+        # changes ratings.
+        if 'review' in tables:
+            rebuild_ratings()
+            review_index.rebuild(self.batch_size)
+        if 'titles' in tables:
+            title_index.rebuild(self.batch_size)
+
+    def refresh_changed(self) -> None:
+        """Refreshes the objects depending on the upserted rows."""
+        changed = self.changed
+        titles = changed['titles'] | self.changed_parents['genre_title']
+        reviews = changed['review'] | self.changed_parents['comments']
+        if changed['category'] or changed['genre']:
+            bump_version(CATALOG_VERSION)
+            titles.update(Title.objects.filter(
+                Q(category__in=changed['category'])
+                | Q(genre__in=changed['genre'])
+            ).values_list('pk', flat=True))
+        if changed['users']:
+            users = User.objects.filter(pk__in=changed['users'])
+            users.update(token_version=F('token_version') + 1)
+            bump_version(AUTH_VERSION)
+            # Reviews and comments render the author username.
+            titles.update(Title.objects.filter(
+                reviews__author__in=users
+            ).values_list('pk', flat=True))
+            reviews.update(Review.objects.filter(
+                Q(author__in=users) | Q(comments__author__in=users)
+            ).values_list('pk', flat=True))
+            touch(Comment.objects.filter(author__in=users))
+        for model, pks in ((Comment, changed['comments']),
+                           (Review, reviews), (Title, titles)):
+            for batch in self.batches(pks):
+                touch(model.objects.filter(pk__in=batch))
+        for batch in self.batches(self.changed_parents['review']):
+            rebuild_ratings(Title.objects.filter(pk__in=batch))
+        for index, pks in ((title_index, changed['titles']),
+                           (review_index, changed['review'])):
+            for batch in self.batches(pks):
+                index.update(index.model.objects.filter(pk__in=batch))
 
     @classmethod
     def get_avaiable_tables(cls) -> List[str]:
@@ -40,97 +643,95 @@ class CsvToDb:
                 result.append(key.replace('csv_to_', ''))
         return result
 
-    def sort_tables(tables: List[str]) -> List[str]:
-        avaiable_tables = CsvToDb.get_avaiable_tables()
-        order = {table: i for i, table in enumerate(avaiable_tables)}
-        return sorted(tables, key=lambda x: order.get(x, float('inf')))
-
-    def csv_to_users(data: List[Dict[str, str]]) -> None:
-        for instance in data:
-            user, status = User.objects.get_or_create(
-                id=instance['id'],
-                username=instance['username'],
-                email=instance['email'],
-                role=instance['role'],
-                bio=instance['bio'],
-                first_name=instance['first_name'],
-                last_name=instance['last_name']
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'User {user} is {created}')
-
-    def csv_to_category(data: List[Dict[str, str]]) -> None:
-        for instance in data:
-            category, status = Category.objects.get_or_create(
-                id=instance['id'],
-                name=instance['name'],
-                slug=instance['slug']
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'Category {category} is {created}')
-
-    def csv_to_genre(data: List[Dict[str, str]]) -> None:
-        for instance in data:
-            genre, status = Genre.objects.get_or_create(
-                id=instance['id'],
-                name=instance['name'],
-                slug=instance['slug']
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'Genre {genre} is {created}')
-
-    def csv_to_titles(data: List[Dict[str, str]]) -> None:
-        for instance in data:
-            category = Category.objects.get(pk=instance['category'])
-            title, status = Title.objects.get_or_create(
-                id=instance['id'],
-                name=instance['name'],
-                year=instance['year'],
-                category=category
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'Title {title} is {created}')
-
-    def csv_to_genre_title(data: Dict[str, str]) -> bool:
-        for instance in data:
-            genre = Genre.objects.get(pk=instance['genre_id'])
-            title = Title.objects.get(pk=instance['title_id'])
-            genre_title, status = GenreTitle.objects.get_or_create(
-                id=instance['id'],
-                genre=genre,
-                title=title
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'GenreTitle {genre_title} is {created}')
-
-    def csv_to_review(data: Dict[str, str]) -> bool:
-        for instance in data:
-            title = Title.objects.get(pk=instance['title_id'])
-            author = User.objects.get(pk=instance['author'])
-            review, status = Review.objects.get_or_create(
-                id=instance['id'],
-                title=title,
-                text=instance['text'],
-                author=author,
-                score=instance['score'],
-                pub_date=instance['pub_date']
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'Review {review} is {created}')
-
-    def csv_to_comments(data: Dict[str, str]) -> bool:
-        for instance in data:
-            review = Review.objects.get(pk=instance['review_id'])
-            author = User.objects.get(pk=instance['author'])
-            comment, status = Comment.objects.get_or_create(
-                id=instance['id'],
-                review=review,
-                text=instance['text'],
-                author=author,
-                pub_date=instance['pub_date']
-            )
-            created = 'created' if status else 'not created'
-            logger.info(f'Comment {comment} is {created}')
+    @classmethod
+    def dependencies(cls) -> Dict[str, Set[str]]:
+        """Tables referenced by the foreign keys of every table."""
+        tables = {model: table for table, model in cls.models.items()}
+        return {
+            table: {tables[field.related_model]
+                    for field in model._meta.concrete_fields
+                    if field.is_relation and field.related_model in tables
+                    and field.related_model is not model}
+            for table, model in cls.models.items()
+        }
+
+    @classmethod
+    def sort_tables(cls, tables: List[str]) -> List[str]:
+        """
+        Orders the tables so that every table follows the tables
+        it references, independent tables keep the methods order.
+        """
+        dependencies = cls.dependencies()
+        avaiable_tables = cls.get_avaiable_tables()
+        pending = sorted(set(tables), key=avaiable_tables.index)
+        result = []
+        while pending:
+            ready = [table for table in pending
+                     if not dependencies[table] & set(pending)]
+            if not ready:
+                raise CommandError(f'Circular references between {pending}.')
+            result += ready
+            pending = [table for table in pending if table not in ready]
+        return result
+
+    @staticmethod
+    def csv_to_users(row: Dict[str, str]) -> User:
+        return User(
+            id=row['id'],
+            username=row['username'],
+            email=row['email'],
+            role=row['role'],
+            bio=row['bio'],
+            first_name=row['first_name'],
+            last_name=row['last_name']
+        )
+
+    @staticmethod
+    def csv_to_category(row: Dict[str, str]) -> Category:
+        return Category(id=row['id'], name=row['name'], slug=row['slug'])
+
+    @staticmethod
+    def csv_to_genre(row: Dict[str, str]) -> Genre:
+        return Genre(id=row['id'], name=row['name'], slug=row['slug'])
+
+    @staticmethod
+    def csv_to_titles(row: Dict[str, str]) -> Title:
+        return Title(
+            id=row['id'],
+            name=row['name'],
+            year=row['year'],
+            description=row.get('description') or '',
+            category_id=row['category'] or None
+        )
+
+    @staticmethod
+    def csv_to_genre_title(row: Dict[str, str]) -> GenreTitle:
+        return GenreTitle(
+            id=row['id'],
+            genre_id=row['genre_id'],
+            title_id=row['title_id']
+        )
+
+    @staticmethod
+    def csv_to_review(row: Dict[str, str]) -> Review:
+        return Review(
+            id=row['id'],
+            title_id=row['title_id'],
+            text=row['text'],
+            author_id=row['author'],
+            score=row['score'],
+            pub_date=row['pub_date']
+        )
+
+    @staticmethod
+    def csv_to_comments(row: Dict[str, str]) -> Comment:
+        return Comment(
+            id=row['id'],
+            review_id=row['review_id'],
+            text=row['text'],
+            author_id=row['author'],
+            pub_date=row['pub_date']
+        )
 
 
 class Command(BaseCommand):
@@ -138,17 +739,46 @@ class Command(BaseCommand):
     Fills db from csv.
     Add csv files in STATIC/data.
     Names must be similar to model names.
+    With --incremental only rows changed since the previous
+    incremental import are written.
     '''
 
     def add_arguments(self, parser: CommandParser) -> None:
-        choices = CsvToDb.get_avaiable_tables().append('all')
-        parser.add_argument('tables', nargs='+', type=str,
-                            choices=choices, default='all')
+        choices = CsvToDb.get_avaiable_tables() + ['all']
+        parser.add_argument('tables', nargs='+', type=str, choices=choices)
+        parser.add_argument('--path', type=Path,
+                            default=settings.BASE_DIR / 'static/data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--incremental', action='store_true',
+                            help='Upsert rows changed since the previous '
+                                 'incremental import.')
+        parser.add_argument('--delete-missing', action='store_true',
+                            help='With --incremental, delete rows removed '
+                                 'from the files since the previous import.')
+        parser.add_argument('--jobs', type=int, default=1,
+                            help='Number of processes parsing the files.')
+        parser.add_argument('--fast', action='store_true',
+                            help='Defer foreign key checks and index '
+                                 'updates to the end of the load.')
 
     def handle(self, *args: Any, **options: Any) -> Optional[str]:
-        path = (settings.BASE_DIR / 'static/data')
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive.')
+        if options['delete_missing'] and not options['incremental']:
+            raise CommandError('--delete-missing requires --incremental.')
+        if options['jobs'] < 1:
+            raise CommandError('Number of jobs must be positive.')
         if 'all' in options['tables']:
-            tables = CsvToDb.get_avaiable_tables()
+            tables = CsvToDb.sort_tables(CsvToDb.get_avaiable_tables())
         else:
             tables = CsvToDb.sort_tables(options['tables'])
-        CsvToDb.parse_tables(tables, path)
+        loader = CsvToDb(options['path'], options['batch_size'],
+                         self.stdout, options['incremental'],
+                         options['delete_missing'], options['jobs'],
+                         options['fast'])
+        started = time.monotonic()
+        loader.parse_tables(tables)
+        self.stdout.write(
+            f'Loaded {len(tables)} tables in '
+            f'{time.monotonic() - started:.2f}s'
+        )
@@ -0,0 +1,198 @@
+import csv
+import gzip
+import json
+import time
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews.management.commands.csv_to_db import CsvToDb
+
+FORMATS = ('csv', 'ndjson')
+
+
+class DbToCsv:
+    """
+    Writes the tables of CsvToDb in the layout it reads.
+
+    Rows are read by primary key in batches of `batch_size`, every batch
+    is a short query, so memory stays constant and no long transaction
+    is held open. With `chunk_size` a table is split into files of that
+    many rows named `<table>.<first id>-<last id>.<ext>`; a file gets its
+    name only when complete, so a rerun continues after the last
+    complete chunk.
+    """
+
+    def __init__(self, path: Path, format: str = 'csv',
+                 compress: bool = False, batch_size: int = 1000,
+                 chunk_size: int = 0, from_id: Optional[int] = None,
+                 to_id: Optional[int] = None, stdout=None):
+        self.path = path
+        self.format = format
+        self.compress = compress
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.from_id = from_id
+        self.to_id = to_id
+        self.stdout = stdout
+
+    @property
+    def extension(self) -> str:
+        return f'{self.format}.gz' if self.compress else self.format
+
+    def read_rows(self, table: str, after: Optional[int]) -> Iterator[tuple]:
+        """Yields the rows of the table with ids after `after`."""
+        model = CsvToDb.models[table]
+        fields = [model._meta.get_field(column).attname
+                  for column in CsvToDb.columns[table]]
+        queryset = model.objects.order_by('pk').values_list(*fields)
+        if self.from_id is not None:
+            queryset = queryset.filter(pk__gte=self.from_id)
+        if self.to_id is not None:
+            queryset = queryset.filter(pk__lte=self.to_id)
+        while True:
+            if after is not None:
+                batch = list(queryset.filter(pk__gt=after)[:self.batch_size])
+            else:
+                batch = list(queryset[:self.batch_size])
+            if not batch:
+                return
+            yield from batch
+            after = batch[-1][0]
+
+    def open(self, file_path: Path) -> IO[str]:
+        if self.compress:
+            return gzip.open(file_path, 'wt', encoding='utf-8', newline='')
+        return open(file_path, 'w', encoding='utf-8', newline='')
+
+    @staticmethod
+    def csv_value(value: Any) -> Any:
+        if value is None:
+            return ''
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+    def write(self, file_path: Path, columns: Sequence[str],
+              rows: Iterator[tuple]) -> Tuple[int, Any, Any]:
+        """
+        Writes the rows to a temporary file renamed to `file_path`
+        by the caller. Returns the number of rows, first and last id.
+        """
+        total = 0
+        first = last = None
+        with self.open(file_path) as fp:
+            if self.format == 'csv':
+                writer = csv.writer(fp, delimiter=',', quotechar='"')
+                writer.writerow(columns)
+            for row in rows:
+                if self.format == 'csv':
+                    writer.writerow([self.csv_value(value) for value in row])
+                else:
+                    fp.write(json.dumps(dict(zip(columns, row)),
+                                        cls=DjangoJSONEncoder,
+                                        ensure_ascii=False))
+                    fp.write('\n')
+                if first is None:
+                    first = row[0]
+                last = row[0]
+                total += 1
+        return total, first, last
+
+    def completed_chunks(self, table: str) -> List[Tuple[int, int]]:
+        """Id ranges of the chunks written by previous runs."""
+        chunks = []
+        for file_path in self.path.glob(f'{table}.*-*.{self.extension}'):
+            ids = file_path.name[len(table) + 1:-len(self.extension) - 1]
+            first, _, last = ids.partition('-')
+            if first.isdigit() and last.isdigit():
+                chunks.append((int(first), int(last)))
+        return sorted(chunks)
+
+    def export_table(self, table: str) -> int:
+        """Writes the table, returns the number of written rows."""
+        started = time.monotonic()
+        columns = CsvToDb.columns[table]
+        part = Path(self.path, f'{table}.{self.extension}.part')
+        if not self.chunk_size:
+            total, _, _ = self.write(part, columns,
+                                     self.read_rows(table, None))
+            part.replace(Path(self.path, f'{table}.{self.extension}'))
+            self.report(table, total, time.monotonic() - started)
+            return total
+        chunks = self.completed_chunks(table)
+        rows = self.read_rows(table, chunks[-1][1] if chunks else None)
+        total = 0
+        while True:
+            count, first, last = self.write(
+                part, columns, islice(rows, self.chunk_size)
+            )
+            if not count:
+                part.unlink()
+                break
+            part.replace(Path(
+                self.path, f'{table}.{first:012d}-{last:012d}.{self.extension}'
+            ))
+            total += count
+        self.report(table, total, time.monotonic() - started)
+        return total
+
+    def report(self, table: str, total: int, seconds: float) -> None:
+        if self.stdout is not None:
+            self.stdout.write(
+                f'{table}: {total} rows in {seconds:.2f}s '
+                f'({total / max(seconds, 1e-6):.0f} rows/s)'
+            )
+
+    def export_tables(self, tables: List[str]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        for table in tables:
+            self.export_table(table)
+
+
+class Command(BaseCommand):
+    help = '''
+    Writes db tables to files in the layout csv_to_db reads.
+    With --chunk-size a rerun continues after the last complete chunk.
+    '''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        choices = CsvToDb.get_avaiable_tables() + ['all']
+        parser.add_argument('tables', nargs='+', type=str, choices=choices)
+        parser.add_argument('--path', type=Path, required=True)
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress the files with gzip.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read by one query.')
+        parser.add_argument('--chunk-size', type=int, default=0,
+                            help='Rows per file, 0 writes one file '
+                                 'per table.')
+        parser.add_argument('--from-id', type=int, default=None)
+        parser.add_argument('--to-id', type=int, default=None)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive.')
+        if options['chunk_size'] < 0:
+            raise CommandError('Chunk size must not be negative.')
+        if 'all' in options['tables']:
+            tables = CsvToDb.sort_tables(CsvToDb.get_avaiable_tables())
+        else:
+            tables = CsvToDb.sort_tables(options['tables'])
+        exporter = DbToCsv(
+            options['path'], options['format'], options['gzip'],
+            options['batch_size'], options['chunk_size'],
+            options['from_id'], options['to_id'], self.stdout
+        )
+        started = time.monotonic()
+        exporter.export_tables(tables)
+        self.stdout.write(
+            f'Exported {len(tables)} tables in '
+            f'{time.monotonic() - started:.2f}s'
+        )
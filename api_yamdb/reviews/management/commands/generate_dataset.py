@@ -0,0 +1,294 @@
+import csv
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from math import gcd
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+
+from reviews.management.commands.csv_to_db import CsvToDb
+from reviews.models import MAX_SCORE, MIN_SCORE, SCORES, User
+
+# Generated dates end here, so a seed always gives the same rows.
+DATES_END = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+DATES_SPAN = timedelta(days=5 * 365)
+FIRST_YEAR = 1900
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей',
+               'Елена', 'Дмитрий', 'Наталья', 'Алексей')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+              'Петров', 'Соколов', 'Михайлов', 'Новиков', 'Фёдоров')
+WORDS = ('история', 'герой', 'время', 'дорога', 'город', 'ночь', 'свет',
+         'песня', 'тайна', 'море', 'война', 'любовь', 'побег', 'дом',
+         'зима', 'друг', 'книга', 'игра', 'мечта', 'путь', 'сюжет',
+         'финал', 'актёр', 'звук', 'смысл', 'образ', 'мир', 'голос')
+# Typical scores of titles, most titles are rated above the middle.
+TYPICAL_SCORE_WEIGHTS = (1, 1, 2, 3, 5, 8, 12, 14, 10, 5)
+
+
+def zipf_index(rng: random.Random, n: int, skew: float) -> int:
+    """
+    Index in range(n) with a Zipf-like distribution, 0 is the most
+    frequent. Inverts the CDF of the continuous approximation,
+    so drawing needs neither a table of weights nor a loop.
+    """
+    u = rng.random()
+    if abs(skew - 1) < 1e-9:
+        rank = n ** u
+    else:
+        rank = ((n ** (1 - skew) - 1) * u + 1) ** (1 / (1 - skew))
+    return min(int(rank), n) - 1
+
+
+class Shuffle:
+    """Bijection of range(n) spreading popular indexes over the ids."""
+
+    def __init__(self, rng: random.Random, n: int):
+        self.n = max(n, 1)
+        self.step = rng.randrange(1, self.n) if self.n > 1 else 1
+        while gcd(self.step, self.n) != 1:
+            self.step += 1
+        self.offset = rng.randrange(self.n)
+
+    def __call__(self, index: int) -> int:
+        return (index * self.step + self.offset) % self.n
+
+
+class DatasetGenerator:
+    """
+    Generates rows of the CsvToDb tables in their csv layout.
+
+    Rows are streamed, nothing is kept per row, and every table has its
+    own random generator derived from the seed, so the same options give
+    the same dataset. Distributions are skewed with the `skew` exponent:
+    reviews go to popular titles and come from prolific authors,
+    comments go to popular reviews, and scores cluster around a typical
+    score of the title with Zipf-distributed deviations.
+    """
+
+    def __init__(self, users: int, titles: int, reviews: int,
+                 comments: int, categories: int, genres: int,
+                 seed: int = 0, skew: float = 1.1):
+        self.sizes = {
+            'users': users,
+            'category': categories,
+            'genre': genres,
+            'titles': titles,
+            'review': reviews,
+            'comments': comments,
+        }
+        self.seed = seed
+        self.skew = skew
+        self.counts = {}
+
+    def get_random(self, name: str) -> random.Random:
+        return random.Random(f'{self.seed}:{name}')
+
+    def rows(self, table: str) -> Iterator[Dict[str, Any]]:
+        """Rows of the table, counted in `counts`."""
+        self.counts[table] = 0
+        generate = getattr(self, f'generate_{table}')
+        for row in generate(self.get_random(table)):
+            self.counts[table] += 1
+            yield row
+
+    def text(self, rng: random.Random, low: int, high: int) -> str:
+        words = rng.choices(WORDS, k=rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def date(self, rng: random.Random) -> str:
+        return (DATES_END - DATES_SPAN * rng.random()).isoformat()
+
+    def generate_users(self, rng: random.Random) -> Iterator[dict]:
+        for pk in range(1, self.sizes['users'] + 1):
+            chance = rng.random()
+            if chance < 0.001:
+                role = User.ADMIN
+            elif chance < 0.01:
+                role = User.MODERATOR
+            else:
+                role = User.USER
+            yield {
+                'id': pk,
+                'username': f'user{pk}',
+                'email': f'user{pk}@yamdb.fake',
+                'role': role,
+                'bio': self.text(rng, 3, 15) if chance < 0.2 else '',
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+            }
+
+    def generate_category(self, rng: random.Random) -> Iterator[dict]:
+        for pk in range(1, self.sizes['category'] + 1):
+            yield {'id': pk, 'name': f'Категория {pk}',
+                   'slug': f'category-{pk}'}
+
+    def generate_genre(self, rng: random.Random) -> Iterator[dict]:
+        for pk in range(1, self.sizes['genre'] + 1):
+            yield {'id': pk, 'name': f'Жанр {pk}', 'slug': f'genre-{pk}'}
+
+    def generate_titles(self, rng: random.Random) -> Iterator[dict]:
+        categories = self.sizes['category']
+        last_year = DATES_END.year
+        for pk in range(1, self.sizes['titles'] + 1):
+            category = ''
+            if categories and rng.random() > 0.05:
+                category = zipf_index(rng, categories, self.skew) + 1
+            yield {
+                'id': pk,
+                'name': f'{self.text(rng, 1, 4)[:-1]} {pk}',
+                'year': last_year - zipf_index(
+                    rng, last_year - FIRST_YEAR + 1, 0.8
+                ),
+                'description': self.text(rng, 5, 30),
+                'category': category,
+            }
+
+    def generate_genre_title(self, rng: random.Random) -> Iterator[dict]:
+        genres = self.sizes['genre']
+        pk = 0
+        for title in range(1, self.sizes['titles'] + 1 if genres else 1):
+            chosen = {zipf_index(rng, genres, self.skew)
+                      for _ in range(rng.randint(1, 3))}
+            for genre in sorted(chosen):
+                pk += 1
+                yield {'id': pk, 'title_id': title, 'genre_id': genre + 1}
+
+    def review_allocation(self) -> Iterator[int]:
+        """
+        Numbers of reviews of titles by popularity rank: proportional to
+        1 / rank ** skew, at most one review per user, `reviews` in total
+        unless there are too few users.
+        """
+        titles, users = self.sizes['titles'], self.sizes['users']
+        weights = sum(1 / rank ** self.skew for rank in range(1, titles + 1))
+        target = self.sizes['review'] / weights if titles else 0
+        cumulative = 0.0
+        allocated = 0
+        for rank in range(1, titles + 1):
+            cumulative += target / rank ** self.skew
+            count = min(users, max(0, round(cumulative) - allocated))
+            allocated += count
+            yield count
+
+    def generate_review(self, rng: random.Random) -> Iterator[dict]:
+        users = self.sizes['users']
+        titles = Shuffle(self.get_random('popular titles'),
+                         self.sizes['titles'])
+        authors = Shuffle(self.get_random('prolific authors'), users)
+        pk = 0
+        for rank, count in enumerate(self.review_allocation()):
+            typical = rng.choices(SCORES, weights=TYPICAL_SCORE_WEIGHTS)[0]
+            if count * 2 > users:
+                chosen = rng.sample(range(users), count)
+            else:
+                chosen = set()
+                while len(chosen) < count:
+                    chosen.add(zipf_index(rng, users, self.skew))
+            for author in chosen:
+                pk += 1
+                deviation = zipf_index(rng, MAX_SCORE, 2) * rng.choice(
+                    (-1, 1)
+                )
+                yield {
+                    'id': pk,
+                    'title_id': titles(rank) + 1,
+                    'text': self.text(rng, 5, 60),
+                    'author': authors(author) + 1,
+                    'score': min(MAX_SCORE,
+                                 max(MIN_SCORE, typical + deviation)),
+                    'pub_date': self.date(rng),
+                }
+
+    def generate_comments(self, rng: random.Random) -> Iterator[dict]:
+        users = self.sizes['users']
+        reviews = sum(self.review_allocation())
+        if not reviews:
+            return
+        popular = Shuffle(self.get_random('popular reviews'), reviews)
+        authors = Shuffle(self.get_random('prolific authors'), users)
+        for pk in range(1, self.sizes['comments'] + 1):
+            yield {
+                'id': pk,
+                'review_id': popular(
+                    zipf_index(rng, reviews, self.skew)
+                ) + 1,
+                'text': self.text(rng, 3, 30),
+                'author': authors(zipf_index(rng, users, self.skew)) + 1,
+                'pub_date': self.date(rng),
+            }
+
+    def write_csv(self, path: Path, table: str) -> int:
+        """Writes the table to a csv file csv_to_db reads."""
+        path.mkdir(parents=True, exist_ok=True)
+        columns = CsvToDb.columns[table]
+        with open(Path(path, f'{table}.csv'), 'w', encoding='utf-8',
+                  newline='') as fp:
+            writer = csv.writer(fp, delimiter=',', quotechar='"')
+            writer.writerow(columns)
+            for row in self.rows(table):
+                writer.writerow([row[column] for column in columns])
+        return self.counts[table]
+
+
+class Command(BaseCommand):
+    help = '''
+    Generates a reproducible synthetic dataset with skewed distributions.
+    Loads it into an empty db with the csv_to_db loader,
+    or with --path writes csv files csv_to_db reads.
+    '''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--titles', type=int, default=10000)
+        parser.add_argument('--reviews', type=int, default=200000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of the popularity '
+                                 'distributions.')
+        parser.add_argument('--path', type=Path, default=None,
+                            help='Write csv files instead of loading.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--fast', action='store_true',
+                            help='Load in the fast mode of csv_to_db.')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        sizes = ('users', 'titles', 'reviews', 'comments', 'categories',
+                 'genres')
+        if any(options[size] < 0 for size in sizes):
+            raise CommandError('Sizes must not be negative.')
+        if options['skew'] <= 0:
+            raise CommandError('Skew must be positive.')
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive.')
+        if options['reviews'] > options['users'] * options['titles']:
+            raise CommandError('A user reviews a title only once, '
+                               'there are too few users or titles.')
+        generator = DatasetGenerator(
+            *(options[size] for size in sizes),
+            seed=options['seed'], skew=options['skew']
+        )
+        tables = CsvToDb.sort_tables(CsvToDb.get_avaiable_tables())
+        started = time.monotonic()
+        if options['path'] is not None:
+            for table in tables:
+                count = generator.write_csv(options['path'], table)
+                self.stdout.write(f'{table}: {count} rows')
+        else:
+            if any(CsvToDb.models[table].objects.exists()
+                   for table in tables):
+                raise CommandError('The database already has data, '
+                                   'use --path to write csv files.')
+            loader = CsvToDb(None, options['batch_size'], self.stdout,
+                             fast=options['fast'])
+            loader.parse_tables(tables, generator.rows)
+        self.stdout.write(
+            f'Generated {len(tables)} tables in '
+            f'{time.monotonic() - started:.2f}s'
+        )
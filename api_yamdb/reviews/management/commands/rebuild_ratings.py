@@ -0,0 +1,26 @@
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from api.counts import bump_table_versions
+from reviews.models import Title
+from reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = '''
+    Recalculates stored title ratings from reviews.
+    Use after bulk loads that bypass model signals.
+    '''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('titles', nargs='*', type=int,
+                            help='Title ids, all titles by default.')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        titles = Title.objects.all()
+        if options['titles']:
+            titles = titles.filter(pk__in=options['titles'])
+        updated = rebuild_ratings(titles)
+        bump_table_versions((Title._meta.db_table,))
+        self.stdout.write(f'Ratings rebuilt for {updated} titles')
@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+from django.core.management.base import (BaseCommand, CommandError,
+                                         CommandParser)
+
+from api.counts import bump_table_versions
+from reviews.search import review_index, title_index
+
+
+class Command(BaseCommand):
+    help = '''
+    Rebuilds the full-text search indexes of titles and reviews.
+    Use after bulk loads that bypass model signals.
+    '''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        if not title_index.is_available():
+            raise CommandError(
+                'Search index is available on SQLite only, run migrations.'
+            )
+        for name, index in (('titles', title_index),
+                            ('reviews', review_index)):
+            total = index.rebuild(batch_size=options['batch_size'])
+            # Search results, and so cached counts, may have changed.
+            bump_table_versions((index.model._meta.db_table,))
+            self.stdout.write(f'Search index rebuilt for {total} {name}')
@@ -0,0 +1,37 @@
+import time
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from reviews.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = '''
+    Delivers queued emails in batches over one mail connection.
+    Sends every due message and exits, with --loop keeps polling.
+    '''
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll for new messages.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls with --loop.')
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = deliver_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if not sent + failed:
+                    break
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(
+                    f'Emails sent: {total_sent}, failed: {total_failed}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
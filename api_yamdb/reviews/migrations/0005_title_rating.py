@@ -0,0 +1,82 @@
+# Generated by Django 3.2 on 2026-10-18 17:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    reviews = (Review.objects.filter(title=OuterRef('pk'))
+               .order_by().values('title'))
+    Title.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count('pk')).values('count')), 0
+        ),
+        score_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')), 0
+        ),
+    )
+    for title in Title.objects.filter(review_count__gt=0).iterator():
+        title.rating = title.score_sum / title.review_count
+        title.save(update_fields=('rating',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_auto_20221223_1752'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ('id',), 'verbose_name': 'category', 'verbose_name_plural': 'categories'},
+        ),
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ('id',), 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='genre',
+            options={'ordering': ('id',), 'verbose_name': 'genre', 'verbose_name_plural': 'genres'},
+        ),
+        migrations.AlterModelOptions(
+            name='genretitle',
+            options={'ordering': ('id',), 'verbose_name': 'genre_title', 'verbose_name_plural': 'genres_titles'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ('id',), 'verbose_name': 'Отзыв', 'verbose_name_plural': 'Отзывы'},
+        ),
+        migrations.AlterModelOptions(
+            name='title',
+            options={'ordering': ('id',), 'verbose_name': 'title', 'verbose_name_plural': 'titles'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ('id',), 'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True, verbose_name='Рейтинг произведения'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, help_text='Введите год выпуска произведения', verbose_name='Год выпуска произведения'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts '
+        "USING fts5(name, description, tokenize='unicode61 remove_diacritics 0')"
+    )
+    schema_editor.execute(
+        'INSERT INTO reviews_title_fts (rowid, name, description) '
+        'SELECT id, name, description FROM reviews_title'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS reviews_title_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_indexes(apps, schema_editor):
+    """
+    Creates the review index and empties the title index, which holds
+    text that is not normalized. The indexes are filled by the
+    rebuild_search_index command, so their content always comes from
+    the current normalizer rather than from a copy frozen here.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_review_fts '
+        'USING fts5(text, title_id, '
+        "tokenize='unicode61 remove_diacritics 0')"
+    )
+    schema_editor.execute('DELETE FROM reviews_title_fts')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS reviews_review_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
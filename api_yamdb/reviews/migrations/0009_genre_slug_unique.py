@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-18 18:04
+
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_slugs(apps, schema_editor):
+    """
+    Duplicate slugs can't be merged safely (the genres may differ
+    in name and titles), so they are left to be resolved by hand.
+    """
+    Genre = apps.get_model('reviews', 'Genre')
+    duplicates = list(
+        Genre.objects.values('slug').annotate(count=Count('id'))
+        .filter(count__gt=1).order_by('slug').values_list('slug', flat=True)
+    )
+    if duplicates:
+        raise CommandError(
+            'Genre slugs must be unique, rename or delete genres with '
+            f'duplicate slugs before migrating: {", ".join(duplicates)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_normalized_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_slugs,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='genre',
+            name='slug',
+            field=models.SlugField(help_text='Введите slug', unique=True, verbose_name='Slug'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_object_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Меняется при изменении данных, записанных в токены', verbose_name='Версия токенов'),
+        ),
+    ]
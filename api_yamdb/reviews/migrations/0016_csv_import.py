@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CsvImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=50, unique=True, verbose_name='Таблица')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма файла')),
+                ('rows', models.JSONField(default=dict, verbose_name='Контрольные суммы строк')),
+                ('imported', models.DateTimeField(auto_now=True, verbose_name='Импортировано')),
+            ],
+            options={
+                'verbose_name': 'Импорт CSV',
+                'verbose_name_plural': 'Импорты CSV',
+            },
+        ),
+    ]
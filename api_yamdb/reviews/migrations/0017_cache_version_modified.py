@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0016_csv_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheversion',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменено'),
+        ),
+    ]
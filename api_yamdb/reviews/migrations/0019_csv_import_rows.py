@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+def move_row_checksums(apps, schema_editor):
+    CsvImport = apps.get_model('reviews', 'CsvImport')
+    CsvImportRow = apps.get_model('reviews', 'CsvImportRow')
+    for state in CsvImport.objects.iterator():
+        CsvImportRow.objects.bulk_create(
+            (CsvImportRow(table=state.table, row_id=row_id,
+                          checksum=checksum)
+             for row_id, checksum in state.rows.items()),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0018_revoked_token_revoked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CsvImportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=50, verbose_name='Таблица')),
+                ('row_id', models.CharField(max_length=64, verbose_name='Id строки')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='Контрольная сумма строки')),
+                ('generation', models.PositiveIntegerField(default=0, verbose_name='Номер импорта')),
+            ],
+            options={
+                'verbose_name': 'Строка импорта CSV',
+                'verbose_name_plural': 'Строки импорта CSV',
+            },
+        ),
+        migrations.AddField(
+            model_name='csvimport',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='Номер импорта'),
+        ),
+        migrations.AddIndex(
+            model_name='csvimportrow',
+            index=models.Index(fields=['table', 'generation'], name='csv_import_row_generation_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='csvimportrow',
+            constraint=models.UniqueConstraint(fields=('table', 'row_id'), name='unique_csv_import_row'),
+        ),
+        migrations.RunPython(move_row_checksums, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='csvimport',
+            name='rows',
+        ),
+    ]
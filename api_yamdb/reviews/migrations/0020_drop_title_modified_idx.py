@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 19:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0019_csv_import_rows'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_modified_idx',
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+MIN_SCORE = 1
+MAX_SCORE = 10
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
 
 
 class User(AbstractUser):
@@ -39,6 +44,14 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Код для авторизации'
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=1,
+        editable=False,
+        help_text='Меняется при изменении данных, записанных в токены'
+    )
+
+    TOKEN_FIELDS = ('username', 'role', 'is_superuser', 'is_active')
 
     @property
     def is_user(self):
@@ -71,6 +84,25 @@ class User(AbstractUser):
         return self.username
 
 
+class VersionedModel(models.Model):
+    """
+    Keeps a version that changes with the representation of the object,
+    used as the ETag / Last-Modified validator of API responses.
+    """
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=1,
+        editable=False
+    )
+    modified = models.DateTimeField(
+        'Изменено',
+        auto_now=True
+    )
+
+    class Meta:
+        abstract = True
+
+
 class Category(models.Model):
     name = models.CharField(
         'Название категории',
@@ -101,7 +133,8 @@ class Genre(models.Model):
     slug = models.SlugField(
         'Slug',
         help_text='Введите slug',
-        max_length=50
+        max_length=50,
+        unique=True
     )
 
     class Meta:
@@ -113,7 +146,7 @@ class Genre(models.Model):
         return f'{self.name} | {self.slug}'
 
 
-class Title(models.Model):
+class Title(VersionedModel):
     name = models.CharField(
         'Название произведения',
         help_text='Введите название произведения',
@@ -141,15 +174,122 @@ class Title(models.Model):
         Genre,
         through='GenreTitle',
         related_name='genre')
+    rating = models.FloatField(
+        'Рейтинг произведения',
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False
+    )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    score_1_count = models.PositiveIntegerField(
+        'Количество оценок 1',
+        default=0,
+        editable=False
+    )
+    score_2_count = models.PositiveIntegerField(
+        'Количество оценок 2',
+        default=0,
+        editable=False
+    )
+    score_3_count = models.PositiveIntegerField(
+        'Количество оценок 3',
+        default=0,
+        editable=False
+    )
+    score_4_count = models.PositiveIntegerField(
+        'Количество оценок 4',
+        default=0,
+        editable=False
+    )
+    score_5_count = models.PositiveIntegerField(
+        'Количество оценок 5',
+        default=0,
+        editable=False
+    )
+    score_6_count = models.PositiveIntegerField(
+        'Количество оценок 6',
+        default=0,
+        editable=False
+    )
+    score_7_count = models.PositiveIntegerField(
+        'Количество оценок 7',
+        default=0,
+        editable=False
+    )
+    score_8_count = models.PositiveIntegerField(
+        'Количество оценок 8',
+        default=0,
+        editable=False
+    )
+    score_9_count = models.PositiveIntegerField(
+        'Количество оценок 9',
+        default=0,
+        editable=False
+    )
+    score_10_count = models.PositiveIntegerField(
+        'Количество оценок 10',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('id',)
         verbose_name = 'title'
         verbose_name_plural = 'titles'
+        indexes = (
+            models.Index(
+                fields=('category', 'year'),
+                name='title_category_year_idx'
+            ),
+        )
+
+    # Written by reviews.ratings with F() updates only.
+    COUNTER_FIELDS = (
+        'rating', 'review_count', 'score_sum',
+        'score_1_count', 'score_2_count', 'score_3_count', 'score_4_count',
+        'score_5_count', 'score_6_count', 'score_7_count', 'score_8_count',
+        'score_9_count', 'score_10_count',
+    )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Saves of a stored title leave the review counters alone,
+        the loaded values may be outdated by concurrent review writes.
+        """
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def histogram_field(score):
+        """Name of the field counting reviews with the given score."""
+        return f'score_{score}_count'
+
+    @property
+    def score_histogram(self):
+        return {
+            score: getattr(self, self.histogram_field(score))
+            for score in SCORES
+        }
+
 
 class GenreTitle(models.Model):
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
@@ -170,7 +310,7 @@ class GenreTitle(models.Model):
         return f'{self.genre} | {self.title}'
 
 
-class Review(models.Model):
+class Review(VersionedModel):
     """
     Class representing a review on Title from auth users.
     """
@@ -188,7 +328,10 @@ class Review(models.Model):
         verbose_name='Автор'
     )
     score = models.IntegerField(
-        validators=(MinValueValidator(1), MaxValueValidator(10)),
+        validators=(
+            MinValueValidator(MIN_SCORE),
+            MaxValueValidator(MAX_SCORE)
+        ),
         verbose_name='Оценка'
     )
     pub_date = models.DateTimeField(
@@ -210,7 +353,7 @@ class Review(models.Model):
         return self.text
 
 
-class Comment(models.Model):
+class Comment(VersionedModel):
     """
     Class representing a comment on Review from auth users.
     """
@@ -239,3 +382,160 @@ class Comment(models.Model):
 
     def __str__(self):
         return self.text
+
+
+class CacheVersion(models.Model):
+    """
+    Version counters of in-process caches. Each worker compares
+    the stored version with the one its cache was built from.
+    """
+    name = models.CharField(
+        'Название кэша',
+        max_length=50,
+        unique=True
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    modified = models.DateTimeField('Изменено', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Версия кэша'
+        verbose_name_plural = 'Версии кэшей'
+
+    def __str__(self):
+        return f'{self.name} | {self.version}'
+
+
+class IssuedToken(models.Model):
+    """Access token issued to a user, kept until it expires."""
+    jti = models.CharField('Идентификатор токена', max_length=255,
+                           unique=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='issued_tokens',
+        verbose_name='Пользователь'
+    )
+    expires_at = models.DateTimeField('Истекает', db_index=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Выданный токен'
+        verbose_name_plural = 'Выданные токены'
+
+    def __str__(self):
+        return self.jti
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked access token. Rows are only appended while the token
+    is valid, workers reload the rows revoked within a recent window.
+    """
+    jti = models.CharField('Идентификатор токена', max_length=255,
+                           unique=True)
+    expires_at = models.DateTimeField('Истекает', db_index=True)
+    revoked_at = models.DateTimeField('Отозван', default=timezone.now,
+                                      db_index=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Отозванный токен'
+        verbose_name_plural = 'Отозванные токены'
+
+    def __str__(self):
+        return self.jti
+
+
+class OutgoingEmail(models.Model):
+    """Email queued in the transaction of the change that caused it."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUSES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (DEAD, 'Не доставлено'),
+    ]
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    to = models.JSONField('Получатели')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = (
+            models.Index(
+                fields=('status', 'next_attempt_at'),
+                name='outgoing_email_due_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.subject} | {", ".join(self.to)}'
+
+
+class CsvImport(models.Model):
+    """
+    State of the last incremental csv_to_db import of a table: the file
+    checksum and the number of the import, row checksums are kept
+    in CsvImportRow.
+    """
+    table = models.CharField('Таблица', max_length=50, unique=True)
+    checksum = models.CharField('Контрольная сумма файла', max_length=64)
+    generation = models.PositiveIntegerField('Номер импорта', default=0)
+    imported = models.DateTimeField('Импортировано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Импорт CSV'
+        verbose_name_plural = 'Импорты CSV'
+
+    def __str__(self):
+        return f'{self.table} | {self.checksum}'
+
+
+class CsvImportRow(models.Model):
+    """
+    Checksum of a row of an incremental csv_to_db import and the number
+    of the last import that found the row in the file.
+    """
+    table = models.CharField('Таблица', max_length=50)
+    row_id = models.CharField('Id строки', max_length=64)
+    checksum = models.CharField('Контрольная сумма строки', max_length=64,
+                                blank=True)
+    generation = models.PositiveIntegerField('Номер импорта', default=0)
+
+    class Meta:
+        verbose_name = 'Строка импорта CSV'
+        verbose_name_plural = 'Строки импорта CSV'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('table', 'row_id'),
+                name='unique_csv_import_row'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('table', 'generation'),
+                name='csv_import_row_generation_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.table} | {self.row_id} | {self.checksum}'
@@ -0,0 +1,94 @@
+"""
+Russian-aware text normalization for search.
+
+Text is split into words, case folded, `ё` is replaced with `е` and
+Russian words are reduced to their stem with the Snowball (Porter)
+Russian algorithm, so inflected forms ("побег", "побега") share one
+index term. The same normalization is applied to indexed documents
+and to search queries.
+"""
+import re
+from typing import List
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(в|вши|вшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(ивш|ывш|ующ|(?<=[ая])(ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено'
+    r'|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю'
+    r'|(?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+DERIVATIONAL = re.compile(r'(ост|ость)$')
+
+
+def region_start(word: str, start: int) -> int:
+    """Start of the region after the first non-vowel following a vowel."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def remove(pattern: re.Pattern, word: str, start: int) -> str:
+    """Removes the longest matching ending lying after `start`."""
+    match = pattern.search(word[start:])
+    return word[:start + match.start()] if match else word
+
+
+def stem(word: str) -> str:
+    """Snowball Russian stemmer, non-Russian words are returned as is."""
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv = next(
+        (position + 1 for position, letter in enumerate(word)
+         if letter in VOWELS),
+        len(word)
+    )
+    r2 = region_start(word, region_start(word, 0))
+
+    result = remove(PERFECTIVE_GERUND, word, rv)
+    if result == word:
+        word = remove(REFLEXIVE, word, rv)
+        result = remove(ADJECTIVE, word, rv)
+        if result != word:
+            result = remove(PARTICIPLE, result, rv)
+        else:
+            result = remove(VERB, word, rv)
+            if result == word:
+                result = remove(NOUN, word, rv)
+    word = result
+
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+    word = remove(DERIVATIONAL, word, r2)
+
+    if word.endswith('ь') and len(word) > rv:
+        return word[:-1]
+    word = remove(SUPERLATIVE, word, rv)
+    if word.endswith('нн') and len(word) - 1 > rv:
+        word = word[:-1]
+    return word
+
+
+def normalize_word(word: str) -> str:
+    return stem(word.casefold().replace('ё', 'е'))
+
+
+def normalize(text: str) -> List[str]:
+    """Normalized words of the text."""
+    return [normalize_word(word) for word in WORD_RE.findall(text or '')]
@@ -0,0 +1,138 @@
+"""
+Transactional email outbox.
+
+Requests don't talk to the mail server: `queue_email` stores the message
+in the transaction of the change that caused it, and the `send_outbox`
+command delivers due messages in batches over one mail connection.
+Messages are leased in a short transaction and sent outside of it, so
+a slow mail server never holds database locks.
+A failed message is retried after EMAIL_OUTBOX_RETRY_DELAY seconds,
+doubled after every attempt up to EMAIL_OUTBOX_MAX_RETRY_DELAY; after
+EMAIL_OUTBOX_MAX_ATTEMPTS attempts it is marked dead and kept with the
+last error for inspection.
+"""
+from datetime import timedelta
+from typing import List, Sequence, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def queue_email(subject: str, body: str, to: Sequence[str],
+                from_email: str = None) -> OutgoingEmail:
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.EMAIL_ADMIN,
+        to=list(to)
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts."""
+    delay = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    limit = getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_DELAY', 3600)
+    return timedelta(seconds=min(delay * 2 ** (attempts - 1), limit))
+
+
+def send_batch(messages: List[OutgoingEmail], connection) -> List[str]:
+    """
+    Sends the messages over the open connection one at a time, so
+    a failure leaves the messages already sent out of the retries.
+    Returns an error per message, empty if sent.
+    """
+    errors = []
+    for message in messages:
+        email = EmailMessage(message.subject, message.body,
+                             message.from_email, message.to,
+                             connection=connection)
+        try:
+            sent = connection.send_messages([email])
+        except Exception as error:
+            errors.append(repr(error))
+            continue
+        errors.append('' if sent else 'Message was not sent')
+    return errors
+
+
+def claim_due(batch_size: int) -> List[OutgoingEmail]:
+    """
+    Leases due messages to the caller in one short transaction by
+    moving their next attempt EMAIL_OUTBOX_LEASE seconds ahead, so
+    other workers skip them while they are sent outside a transaction.
+    Messages of a worker that dies mid-batch are retried after the lease.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(
+        seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 300)
+    )
+    with transaction.atomic():
+        due = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING,
+            next_attempt_at__lte=now
+        )
+        ids = due.order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            # Parallel workers take different batches.
+            ids = ids.select_for_update(skip_locked=True)
+        ids = list(ids.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Rows leased by another worker meanwhile no longer match `due`.
+        due.filter(pk__in=ids).update(next_attempt_at=lease_until)
+        return list(OutgoingEmail.objects.filter(
+            pk__in=ids, next_attempt_at=lease_until
+        ).order_by('id'))
+
+
+def record_results(messages: List[OutgoingEmail],
+                   errors: List[str]) -> Tuple[int, int]:
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    sent = [message.pk for message, error in zip(messages, errors)
+            if not error]
+    failed = [(message, error)
+              for message, error in zip(messages, errors) if error]
+    for message, error in failed:
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= max_attempts:
+            message.status = OutgoingEmail.DEAD
+        else:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+    with transaction.atomic():
+        OutgoingEmail.objects.filter(pk__in=sent).update(
+            status=OutgoingEmail.SENT, sent_at=now, last_error=''
+        )
+        OutgoingEmail.objects.bulk_update(
+            [message for message, _ in failed],
+            ('attempts', 'last_error', 'status', 'next_attempt_at')
+        )
+    return len(sent), len(failed)
+
+
+def deliver_outbox(batch_size: int = None) -> Tuple[int, int]:
+    """
+    Delivers one batch of due messages: claims them, sends them without
+    holding a transaction and records the results.
+    Returns the numbers of sent and failed messages.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE',
+                                       100)
+    messages = claim_due(batch_size)
+    if not messages:
+        return 0, 0
+    connection = get_connection()
+    try:
+        connection.open()
+        errors = send_batch(messages, connection)
+    except Exception as error:
+        errors = [repr(error)] * len(messages)
+    finally:
+        connection.close()
+    return record_results(messages, errors)
@@ -0,0 +1,139 @@
+"""
+Stored title rating.
+
+`Title.rating`, `Title.review_count`, `Title.score_sum` and the per-score
+histogram fields are kept up to date by single UPDATE statements on
+every review write, so reading the rating never aggregates over reviews.
+"""
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+
+from .models import MAX_SCORE, MIN_SCORE, SCORES, Review, Title
+from .versions import touch_expressions
+
+
+def rating_expressions(removed: Optional[int] = None,
+                       added: Optional[int] = None) -> dict:
+    """
+    Returns update() kwargs replacing the `removed` score
+    with the `added` one, None means no score.
+    """
+    count_delta = (added is not None) - (removed is not None)
+    review_count = F('review_count') + count_delta
+    score_sum = F('score_sum') + (added or 0) - (removed or 0)
+    updates = {
+        'review_count': review_count,
+        'score_sum': score_sum,
+        'rating': Case(
+            When(
+                review_count__gt=-count_delta,
+                then=(Cast(score_sum, FloatField())
+                      / Cast(review_count, FloatField()))
+            ),
+            default=Value(None),
+            output_field=FloatField()
+        ),
+    }
+    if removed != added:
+        if removed is not None:
+            field = Title.histogram_field(removed)
+            updates[field] = F(field) - 1
+        if added is not None:
+            field = Title.histogram_field(added)
+            updates[field] = F(field) + 1
+    return updates
+
+
+def apply_review_change(title_id: int, removed: Optional[int] = None,
+                        added: Optional[int] = None) -> None:
+    """
+    Atomically applies a review create/rescore/delete to its title,
+    the title version is bumped in the same statement.
+    """
+    updates = touch_expressions()
+    if removed != added:
+        updates.update(rating_expressions(removed, added))
+    Title.objects.filter(pk=title_id).update(**updates)
+
+
+def rebuild_ratings(titles=None) -> int:
+    """
+    Recalculates stored ratings from the reviews table.
+    Returns the number of updated titles.
+    """
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = (Review.objects.filter(title=OuterRef('pk'))
+               .order_by().values('title'))
+    counters = {
+        Title.histogram_field(score): Coalesce(Subquery(
+            reviews.annotate(
+                count=Count('pk', filter=Q(score=score))
+            ).values('count')
+        ), 0)
+        for score in SCORES
+    }
+    with transaction.atomic():
+        updated = titles.update(
+            review_count=Coalesce(
+                Subquery(reviews.annotate(count=Count('pk')).values('count')),
+                0
+            ),
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0
+            ),
+            **counters
+        )
+        titles.update(**rating_expressions(), **touch_expressions())
+    return updated
+
+
+def histogram_mean(histogram: Dict[int, int]) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    return sum(score * count for score, count in histogram.items()) / total
+
+
+def histogram_median(histogram: Dict[int, int]) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    def nth_score(position):
+        seen = 0
+        for score in sorted(histogram):
+            seen += histogram[score]
+            if position < seen:
+                return score
+
+    return (nth_score((total - 1) // 2) + nth_score(total // 2)) / 2
+
+
+def weighted_rating(histogram: Dict[int, int]) -> float:
+    """
+    Bayesian average: the mean pulled towards RATING_PRIOR_MEAN
+    with the weight of RATING_PRIOR_WEIGHT reviews.
+    """
+    prior_mean = getattr(settings, 'RATING_PRIOR_MEAN',
+                         (MIN_SCORE + MAX_SCORE) / 2)
+    prior_weight = getattr(settings, 'RATING_PRIOR_WEIGHT', 10)
+    total = sum(histogram.values())
+    score_sum = sum(score * count for score, count in histogram.items())
+    return (prior_mean * prior_weight + score_sum) / (prior_weight + total)
+
+
+def score_distribution(title: Title) -> dict:
+    histogram = title.score_histogram
+    return {
+        'histogram': {str(score): histogram[score] for score in SCORES},
+        'mean': histogram_mean(histogram),
+        'median': histogram_median(histogram),
+        'weighted_rating': round(weighted_rating(histogram), 2),
+    }
@@ -0,0 +1,159 @@
+"""
+Full-text search over model text fields.
+
+On SQLite the text is kept in an FTS5 virtual table whose rowid is the
+model primary key; searches join it to the model table and order
+the matches by bm25. Both the indexed text and the queries pass through
+the Russian normalizer, so inflected forms match each other. Scope
+columns (e.g. the title of a review) are indexed as exact terms that
+restrict searches inside the index. Other databases fall back to
+`icontains` lookups.
+"""
+from typing import Iterable, Sequence
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Review, Title
+from .normalizer import normalize
+
+
+class SearchIndex:
+    def __init__(self, model, fields: Sequence[str], table: str,
+                 scope: Sequence[str] = ()):
+        self.model = model
+        self.fields = tuple(fields)
+        self.scope = tuple(scope)
+        self.table = table
+        self._available = {}
+
+    @property
+    def db(self):
+        return router.db_for_write(self.model)
+
+    def is_available(self) -> bool:
+        """
+        Whether the index table exists. Only a positive answer is cached,
+        the table may be created by migrations after the first check.
+        """
+        if not self._available.get(self.db):
+            connection = connections[self.db]
+            self._available[self.db] = (
+                connection.vendor == 'sqlite'
+                and self.table in connection.introspection.table_names()
+            )
+        return self._available[self.db]
+
+    def document(self, instance) -> list:
+        return [
+            *(' '.join(normalize(getattr(instance, field)))
+              for field in self.fields),
+            *(self.model._meta.get_field(column).to_python(
+                getattr(instance, column)
+            ) for column in self.scope),
+        ]
+
+    def update(self, instances: Iterable, replace: bool = True) -> None:
+        """
+        Indexes new or changed instances in one transaction,
+        `replace=False` skips deleting previous rows of the instances.
+        """
+        if not self.is_available():
+            return
+        rows = [(instance.pk, *self.document(instance))
+                for instance in instances]
+        if not rows:
+            return
+        columns = ', '.join(self.fields + self.scope)
+        placeholders = ', '.join(['%s'] * len(rows[0]))
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                if replace:
+                    cursor.executemany(
+                        f'DELETE FROM {self.table} WHERE rowid = %s',
+                        [(row[0],) for row in rows]
+                    )
+                cursor.executemany(
+                    f'INSERT INTO {self.table} (rowid, {columns}) '
+                    f'VALUES ({placeholders})',
+                    rows
+                )
+
+    def delete(self, pks: Iterable[int]) -> None:
+        if not self.is_available():
+            return
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.executemany(
+                    f'DELETE FROM {self.table} WHERE rowid = %s',
+                    [(pk,) for pk in pks]
+                )
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """
+        Reindexes all instances, returns their number.
+        The table is emptied first, so batches are only inserted.
+        """
+        if not self.is_available():
+            return 0
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        total = 0
+        batch = []
+        queryset = (self.model.objects.only(*self.fields, *self.scope)
+                    .order_by('pk'))
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) == batch_size:
+                self.update(batch, replace=False)
+                total += len(batch)
+                batch = []
+        self.update(batch, replace=False)
+        return total + len(batch)
+
+    def build_query(self, text: str, **scope) -> str:
+        """
+        Normalized words of the text as quoted FTS5 prefix terms
+        matched in the text fields, and ANDed exact scope terms, so
+        the scope is resolved by the index before rows are read.
+        """
+        terms = ' '.join(f'"{word}"*' for word in normalize(text))
+        if not terms:
+            return ''
+        query = f'{{{" ".join(self.fields)}}} : ({terms})'
+        for column, value in scope.items():
+            value = str(value).replace('"', '""')
+            query = f'{column} : "{value}" AND {query}'
+        return query
+
+    def filter(self, queryset, text: str, **scope):
+        """
+        Narrows the queryset to matches ordered by relevance,
+        `scope` restricts the search by the scope columns.
+
+        The index table is joined to the queryset, so the match, its
+        ranking, pagination and counts all run in one SQL query.
+        """
+        if not self.is_available():
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f'{field}__icontains': text})
+            return queryset.filter(condition, **scope)
+        query = self.build_query(text, **scope)
+        if not query:
+            return queryset.none()
+        meta = queryset.model._meta
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = {meta.db_table}.{meta.pk.column}',
+                f'{self.table} MATCH %s',
+            ],
+            params=[query],
+        ).order_by(RawSQL(f'{self.table}.rank', ()), 'pk')
+
+
+title_index = SearchIndex(Title, ('name', 'description'), 'reviews_title_fts')
+review_index = SearchIndex(Review, ('text',), 'reviews_review_fts',
+                           scope=('title_id',))
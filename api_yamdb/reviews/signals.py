@@ -0,0 +1,184 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .catalog import VERSION_NAME as CATALOG_VERSION
+from .catalog import catalog
+from .models import (Category, Comment, Genre, GenreTitle, Review, Title,
+                     User)
+from .ratings import apply_review_change, rebuild_ratings
+from .search import review_index, title_index
+from .versions import bump_version, touch
+
+
+@receiver(post_init, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    """Keeps the stored score to compute rating deltas on save."""
+    if instance.pk is None:
+        instance._rated = None
+    else:
+        instance._rated = (
+            instance.__dict__.get('title_id'),
+            instance.__dict__.get('score')
+        )
+
+
+@receiver(pre_save, sender=Review)
+def lock_review_score(sender, instance, **kwargs):
+    """
+    Reads the stored score of a changed review, the remembered one
+    may be outdated. Inside a transaction the row stays locked until
+    commit, so concurrent rescores apply their deltas one by one.
+    """
+    if instance._state.adding:
+        return
+    reviews = Review.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        reviews = reviews.select_for_update()
+    instance._rated = reviews.values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rated', None)
+    current = (instance.title_id, instance.score)
+    if created:
+        apply_review_change(instance.title_id, added=instance.score)
+    elif previous is None or None in previous:
+        rebuild_ratings(Title.objects.filter(pk=instance.title_id))
+    elif previous[0] != current[0]:
+        apply_review_change(previous[0], removed=previous[1])
+        apply_review_change(current[0], added=current[1])
+    else:
+        apply_review_change(instance.title_id, removed=previous[1],
+                            added=instance.score)
+    instance._rated = current
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_rated', None)
+    if previous is None or None in previous:
+        previous = (instance.title_id, instance.score)
+    apply_review_change(previous[0], removed=previous[1])
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    title_index.update((instance,))
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    title_index.delete((instance.pk,))
+
+
+@receiver(post_save, sender=Review)
+def index_review(sender, instance, **kwargs):
+    review_index.update((instance,))
+
+
+@receiver(post_delete, sender=Review)
+def unindex_review(sender, instance, **kwargs):
+    review_index.delete((instance.pk,))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_catalog(sender, **kwargs):
+    bump_version(CATALOG_VERSION)
+    catalog.invalidate()
+
+
+@receiver(pre_save, sender=Title)
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=Comment)
+def bump_object_version(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def resolve_object_version(sender, instance, created, **kwargs):
+    """
+    Loads the version bumped by an F() expression on save,
+    and the review counters a title save doesn't write.
+    """
+    if not created:
+        instance.refresh_from_db(
+            fields=['version', *getattr(sender, 'COUNTER_FIELDS', ())]
+        )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_review(sender, instance, **kwargs):
+    touch(Review.objects.filter(pk=instance.review_id))
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_genre_title(sender, instance, **kwargs):
+    touch(Title.objects.filter(pk=instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genres_change(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch(Title.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch(Title.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        touch(Title.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, created=False, **kwargs):
+    if not created:
+        touch(Title.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_genre_titles(sender, instance, created=False, **kwargs):
+    if not created:
+        touch(Title.objects.filter(genre=instance))
+
+
+@receiver(post_init, sender=User)
+def remember_token_fields(sender, instance, **kwargs):
+    instance._stored_token_fields = {
+        field: instance.__dict__.get(field) for field in User.TOKEN_FIELDS
+    }
+
+
+@receiver(pre_save, sender=User)
+def bump_token_version(sender, instance, **kwargs):
+    """Tokens issued before a role, name or status change are outdated."""
+    instance._token_fields_changed = not instance._state.adding and any(
+        getattr(instance, field) != value
+        for field, value in instance._stored_token_fields.items()
+    )
+    if instance._token_fields_changed:
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=User)
+def touch_authored_on_rename(sender, instance, created, **kwargs):
+    """Reviews and comments render the author username."""
+    stored = instance._stored_token_fields
+    if not created and stored['username'] != instance.username:
+        touch(Title.objects.filter(reviews__author=instance))
+        touch(Review.objects.filter(author=instance))
+        touch(Review.objects.filter(comments__author=instance))
+        touch(Comment.objects.filter(author=instance))
+    remember_token_fields(sender, instance)
@@ -0,0 +1,29 @@
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CacheVersion
+
+
+def get_version(name: str) -> int:
+    version = (CacheVersion.objects.filter(name=name)
+               .values_list('version', flat=True).first())
+    return version or 0
+
+
+def bump_version(name: str) -> None:
+    """Invalidates the named cache in every worker process."""
+    updates = {'version': F('version') + 1, 'modified': timezone.now()}
+    updated = CacheVersion.objects.filter(name=name).update(**updates)
+    if not updated:
+        CacheVersion.objects.get_or_create(name=name)
+        CacheVersion.objects.filter(name=name).update(**updates)
+
+
+def touch_expressions() -> dict:
+    """update() kwargs marking rows of a versioned model as changed."""
+    return {'version': F('version') + 1, 'modified': timezone.now()}
+
+
+def touch(queryset) -> int:
+    """Bumps the version of every object in the queryset."""
+    return queryset.update(**touch_expressions())
@@ -0,0 +1,137 @@
+"""
+Measures API scenarios through the Django test client.
+
+A scenario is a request repeated with a growing index: the index picks
+the object of a detail request and makes the data of a create request
+unique. Every timed request is also counted in SQL queries; peak
+memory is measured on a separate untimed request, because tracemalloc
+slows down the code it traces.
+"""
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from django.db import connection
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Percentile with linear interpolation between the closest ranks."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries of the default connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Scenario:
+    """
+    A request of `method` to `path(index)` with `data(index)`, made by
+    the client of `role` and expected to answer with `status`.
+    `headers(index)` adds request headers, e.g. the authorization
+    of a different user per request.
+    """
+
+    def __init__(self, name: str, method: str, path: Callable[[int], str],
+                 data: Optional[Callable[[int], dict]] = None,
+                 role: str = 'anonymous', status: int = 200,
+                 headers: Optional[Callable[[int], dict]] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.role = role
+        self.status = status
+        self.headers = headers
+
+    def request(self, client, index: int):
+        send = getattr(client, self.method.lower())
+        extra = self.headers(index) if self.headers is not None else {}
+        if self.data is None:
+            return send(self.path(index), **extra)
+        return send(self.path(index), self.data(index), format='json',
+                    **extra)
+
+
+def measure(scenario: Scenario, client, requests: int,
+            warmup: int = 10) -> Dict[str, Any]:
+    """Runs the scenario, returns its latency, query and memory stats."""
+    for index in range(warmup):
+        scenario.request(client, index)
+
+    tracemalloc.start()
+    try:
+        scenario.request(client, warmup)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = 0
+    started = time.perf_counter()
+    for index in range(warmup + 1, warmup + 1 + requests):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            request_started = time.perf_counter()
+            response = scenario.request(client, index)
+            latencies.append(time.perf_counter() - request_started)
+        queries.append(counter.count)
+        if response.status_code != scenario.status:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'method': scenario.method,
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / max(requests, 1) * 1000, 3),
+        'throughput_rps': round(requests / max(elapsed, 1e-9), 1),
+        'queries_p50': int(percentile(queries, 0.50)),
+        'queries_mean': round(sum(queries) / max(requests, 1), 2),
+        'queries_max': max(queries, default=0),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(old: Results, new: Results,
+            threshold: float = 0.2) -> List[str]:
+    """
+    Regressions of `new` against `old` scenario results: p95 latency
+    grown by more than `threshold` or more queries in a typical request.
+    The median query count doesn't depend on the machine or on rare
+    cache refreshes, so any growth counts.
+    """
+    regressions = []
+    for name, result in new.items():
+        baseline = old.get(name)
+        if baseline is None:
+            continue
+        if result['p95_ms'] > baseline['p95_ms'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 {baseline["p95_ms"]:.2f} -> '
+                f'{result["p95_ms"]:.2f} ms'
+            )
+        if result['queries_p50'] > baseline['queries_p50']:
+            regressions.append(
+                f'{name}: queries {baseline["queries_p50"]} -> '
+                f'{result["queries_p50"]}'
+            )
+    return regressions
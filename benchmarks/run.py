@@ -0,0 +1,156 @@
+"""
+Runs the API benchmark scenarios and writes their results as JSON.
+
+    python -m benchmarks.run --output results.json [--compare old.json]
+
+Scenarios run through the Django test client in a throwaway test
+database filled by the generate_dataset command, so results of two
+commits with the same options are comparable. With --compare the
+results are checked against an earlier run, and regressions make
+the exit status 1.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = BASE_DIR / 'api_yamdb'
+DATASET = {'users': 2000, 'titles': 2000, 'reviews': 20000,
+           'comments': 10000, 'categories': 10, 'genres': 30}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', type=Path,
+                        default=BASE_DIR / 'bench_results.json')
+    parser.add_argument('--compare', type=Path, default=None,
+                        help='Results of an earlier run to compare with.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative growth of p95 latency.')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Timed requests per scenario.')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--scenario', action='append', default=None,
+                        help='Run only this scenario, may be repeated.')
+    parser.add_argument('--seed', type=int, default=0)
+    for size, default in DATASET.items():
+        parser.add_argument(f'--{size}', type=int, default=default)
+    return parser.parse_args(argv)
+
+
+def setup_django() -> None:
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    from django.test.utils import setup_test_environment
+    django.setup()
+    setup_test_environment()
+
+
+def run_scenarios(args: argparse.Namespace) -> dict:
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    from benchmarks.harness import measure
+    from benchmarks.scenarios import build_scenarios, prepare_clients
+
+    dataset = {size: getattr(args, size) for size in DATASET}
+    call_command('generate_dataset', seed=args.seed, stdout=sys.stderr,
+                 **dataset)
+    clients = prepare_clients()
+    scenarios = build_scenarios(args.warmup + 1 + args.requests)
+    if args.scenario:
+        unknown = set(args.scenario) - {item.name for item in scenarios}
+        if unknown:
+            raise SystemExit(f'Unknown scenarios: {", ".join(unknown)}')
+        scenarios = [item for item in scenarios
+                     if item.name in args.scenario]
+
+    # Failed requests are counted in the results instead.
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    # Throttling would turn the repeated requests into 429 responses.
+    rest_framework = {**settings.REST_FRAMEWORK,
+                      'DEFAULT_THROTTLE_RATES': {}}
+    results = {}
+    with override_settings(REST_FRAMEWORK=rest_framework):
+        for scenario in scenarios:
+            result = measure(scenario, clients[scenario.role],
+                             args.requests, args.warmup)
+            results[scenario.name] = result
+            print(f'{scenario.name:22} p50 {result["p50_ms"]:8.2f} ms  '
+                  f'p95 {result["p95_ms"]:8.2f} ms  '
+                  f'p99 {result["p99_ms"]:8.2f} ms  '
+                  f'{result["queries_p50"]:3} queries  '
+                  f'{result["peak_memory_kib"]:8.1f} KiB  '
+                  f'{result["errors"]} errors', file=sys.stderr)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'dataset': dataset,
+            'seed': args.seed,
+            'requests': args.requests,
+            'warmup': args.warmup,
+        },
+        'scenarios': results,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.requests < 1 or args.warmup < 0:
+        raise SystemExit('--requests must be positive, '
+                         '--warmup must not be negative.')
+    setup_django()
+    from django.db import connection
+
+    from benchmarks.harness import compare
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                       serialize=False)
+    try:
+        report = run_scenarios(args)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False),
+                           encoding='utf-8')
+    print(f'Results written to {args.output}', file=sys.stderr)
+    if args.compare is None:
+        return 0
+    baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+    if baseline['meta'].get('dataset') != report['meta']['dataset']:
+        print('Warning: the results were measured on different datasets.',
+              file=sys.stderr)
+    regressions = compare(baseline['scenarios'], report['scenarios'],
+                          args.threshold)
+    for regression in regressions:
+        print(f'Regression: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Scenarios of every route of api/urls.py against a generated dataset.
+
+Read scenarios walk objects in primary key order, which in the
+generated data starts with the most reviewed title and its reviews.
+Create scenarios make unique objects from the request index; every
+review is written by a fresh user, who has no review of the title yet.
+"""
+from itertools import cycle, islice
+from typing import Dict, List
+
+from rest_framework.test import APIClient
+
+from api.authentication import access_token_for
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+from .harness import Scenario
+
+API = '/api/v1'
+BENCH_ADMIN = 'bench_admin'
+BENCH_USER = 'bench_user'
+BENCH_AUTHOR = 'bench_author_'
+CONFIRMATION_CODE = 'bench-code'
+
+
+def sample(queryset, count: int) -> List:
+    """`count` values of the queryset, repeated if there are fewer."""
+    values = list(queryset[:count])
+    return list(islice(cycle(values), count)) if values else []
+
+
+def prepare_clients() -> Dict[str, APIClient]:
+    """Clients of the scenario roles, with their users created."""
+    admin = User.objects.create_user(
+        username=BENCH_ADMIN, email=f'{BENCH_ADMIN}@yamdb.fake',
+        role=User.ADMIN
+    )
+    User.objects.create_user(
+        username=BENCH_USER, email=f'{BENCH_USER}@yamdb.fake',
+        confirmation_code=CONFIRMATION_CODE
+    )
+    admin_client = APIClient()
+    admin_client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {access_token_for(admin)}'
+    )
+    return {'anonymous': APIClient(), 'admin': admin_client}
+
+
+def prepare_authors(count: int) -> List[Dict[str, str]]:
+    """Authorization headers of `count` fresh users."""
+    User.objects.bulk_create(
+        User(username=f'{BENCH_AUTHOR}{index}',
+             email=f'{BENCH_AUTHOR}{index}@yamdb.fake')
+        for index in range(count)
+    )
+    authors = User.objects.filter(
+        username__startswith=BENCH_AUTHOR
+    ).order_by('pk')
+    return [{'HTTP_AUTHORIZATION': f'Bearer {access_token_for(author)}'}
+            for author in authors]
+
+
+def build_scenarios(count: int) -> List[Scenario]:
+    """Scenarios for `count` requests each, warmup included."""
+    authors = prepare_authors(count)
+    titles = sample(Title.objects.order_by('pk').values_list('pk',
+                                                             flat=True),
+                    count)
+    reviews = sample(Review.objects.order_by('pk').values_list('title_id',
+                                                               'pk'),
+                     count)
+    comments = sample(
+        Comment.objects.order_by('pk').values_list(
+            'review__title_id', 'review_id', 'pk'
+        ),
+        count
+    )
+    usernames = sample(User.objects.order_by('pk').values_list('username',
+                                                               flat=True),
+                       count)
+    category = Category.objects.order_by('pk').values_list(
+        'slug', flat=True
+    ).first()
+    genre = Genre.objects.order_by('pk').values_list(
+        'slug', flat=True
+    ).first()
+    title, review = reviews[0] if reviews else (None, None)
+
+    return [
+        Scenario('categories_list', 'GET',
+                 lambda i: f'{API}/categories/'),
+        Scenario('categories_create', 'POST',
+                 lambda i: f'{API}/categories/',
+                 lambda i: {'name': f'Бенчмарк {i}', 'slug': f'bench-{i}'},
+                 role='admin', status=201),
+        Scenario('genres_list', 'GET', lambda i: f'{API}/genres/'),
+        Scenario('genres_create', 'POST',
+                 lambda i: f'{API}/genres/',
+                 lambda i: {'name': f'Бенчмарк {i}', 'slug': f'bench-{i}'},
+                 role='admin', status=201),
+        Scenario('titles_list', 'GET', lambda i: f'{API}/titles/'),
+        Scenario('titles_list_filtered', 'GET',
+                 lambda i: f'{API}/titles/?genre={genre}&year_min=2000'),
+        Scenario('titles_detail', 'GET',
+                 lambda i: f'{API}/titles/{titles[i]}/'),
+        Scenario('titles_create', 'POST',
+                 lambda i: f'{API}/titles/',
+                 lambda i: {'name': f'Бенчмарк {i}', 'year': 2000,
+                            'description': 'Бенчмарк',
+                            'genre': [genre], 'category': category},
+                 role='admin', status=201),
+        Scenario('reviews_list', 'GET',
+                 lambda i: f'{API}/titles/{titles[i]}/reviews/'),
+        Scenario('reviews_detail', 'GET',
+                 lambda i: f'{API}/titles/{reviews[i][0]}/reviews/'
+                           f'{reviews[i][1]}/'),
+        Scenario('reviews_create', 'POST',
+                 lambda i: f'{API}/titles/{titles[i]}/reviews/',
+                 lambda i: {'text': 'Бенчмарк', 'score': i % 10 + 1},
+                 status=201, headers=lambda i: authors[i]),
+        Scenario('comments_list', 'GET',
+                 lambda i: f'{API}/titles/{reviews[i][0]}/reviews/'
+                           f'{reviews[i][1]}/comments/'),
+        Scenario('comments_detail', 'GET',
+                 lambda i: f'{API}/titles/{comments[i][0]}/reviews/'
+                           f'{comments[i][1]}/comments/{comments[i][2]}/'),
+        Scenario('comments_create', 'POST',
+                 lambda i: f'{API}/titles/{title}/reviews/{review}/'
+                           f'comments/',
+                 lambda i: {'text': f'Бенчмарк {i}'},
+                 role='admin', status=201),
+        Scenario('users_list', 'GET', lambda i: f'{API}/users/',
+                 role='admin'),
+        Scenario('users_detail', 'GET',
+                 lambda i: f'{API}/users/{usernames[i]}/', role='admin'),
+        Scenario('users_create', 'POST',
+                 lambda i: f'{API}/users/',
+                 lambda i: {'username': f'bench_created_{i}',
+                            'email': f'bench_created_{i}@yamdb.fake'},
+                 role='admin', status=201),
+        Scenario('users_me', 'GET', lambda i: f'{API}/users/me/',
+                 role='admin'),
+        Scenario('auth_signup', 'POST',
+                 lambda i: f'{API}/auth/signup/',
+                 lambda i: {'username': f'bench_signup_{i}',
+                            'email': f'bench_signup_{i}@yamdb.fake'}),
+        Scenario('auth_token', 'POST',
+                 lambda i: f'{API}/auth/token/',
+                 lambda i: {'username': BENCH_USER,
+                            'confirmation_code': CONFIRMATION_CODE},
+                 status=201),
+    ]
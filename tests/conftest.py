@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +34,26 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def throttle_store(tmp_path_factory):
+    """Keeps test buckets apart from the store of a running server."""
+    from django.conf import settings
+    settings.THROTTLE_STORE_PATH = str(
+        tmp_path_factory.mktemp('throttle') / 'buckets.sqlite3'
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from api.authentication import token_cache
+    from api.revocation import revocation_list
+    from api.throttling import bucket_store
+    from django.core.cache import cache
+    from reviews.catalog import catalog
+    cache.clear()
+    catalog.invalidate()
+    token_cache.invalidate()
+    revocation_list.invalidate()
+    bucket_store.clear()
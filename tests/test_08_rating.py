@@ -0,0 +1,142 @@
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    def get_title(self, client, title_id):
+        return client.get(f'/api/v1/titles/{title_id}/').json()
+
+    def test_01_rating_follows_review_writes(self, admin_client, user_client,
+                                             moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert self.get_title(admin_client, title_id)['rating'] is None, (
+            'Рейтинг произведения без отзывов должен быть `None`.'
+        )
+
+        create_single_review(user_client, title_id, 'Хорошо', 4)
+        response = create_single_review(moderator_client, title_id, 'Ок', 8)
+        assert self.get_title(admin_client, title_id)['rating'] == 6, (
+            'Рейтинг должен пересчитываться при создании отзыва.'
+        )
+
+        review_id = response.json()['id']
+        moderator_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/',
+            data={'score': 10}
+        )
+        assert self.get_title(admin_client, title_id)['rating'] == 7, (
+            'Рейтинг должен пересчитываться при изменении оценки.'
+        )
+
+        moderator_client.delete(
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+        )
+        assert self.get_title(admin_client, title_id)['rating'] == 4, (
+            'Рейтинг должен пересчитываться при удалении отзыва.'
+        )
+
+    def test_02_rating_follows_user_delete(self, admin_client, user,
+                                           user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Плохо', 2)
+        create_single_review(moderator_client, title_id, 'Отлично', 10)
+
+        user.delete()
+        assert self.get_title(admin_client, title_id)['rating'] == 10, (
+            'Рейтинг должен пересчитываться при каскадном удалении отзывов.'
+        )
+
+    def test_03_rebuild_ratings_command(self, admin_client, user_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Норм', 6)
+        Title.objects.update(rating=None, review_count=0, score_sum=0)
+
+        call_command('rebuild_ratings')
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating, title.review_count, title.score_sum) == (
+            6, 1, 6
+        ), 'Команда `rebuild_ratings` должна пересчитывать рейтинги.'
+
+    def test_04_score_distribution(self, admin_client, user_client,
+                                   moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert 'score_distribution' not in self.get_title(
+            admin_client, title_id
+        ), 'Поле `score_distribution` должно выводиться только по запросу.'
+
+        create_single_review(user_client, title_id, 'Хорошо', 4)
+        create_single_review(moderator_client, title_id, 'Отлично', 10)
+        response = admin_client.get(
+            f'/api/v1/titles/{title_id}/?include=score_distribution'
+        )
+        distribution = response.json().get('score_distribution')
+        assert distribution, (
+            'Проверьте, что параметр `include=score_distribution` добавляет '
+            'распределение оценок в ответ.'
+        )
+        expected_histogram = {str(score): 0 for score in range(1, 11)}
+        expected_histogram.update({'4': 1, '10': 1})
+        assert distribution['histogram'] == expected_histogram
+        assert distribution['mean'] == 7
+        assert distribution['median'] == 7
+        assert distribution['weighted_rating'] == round(
+            (5.5 * 10 + 14) / 12, 2
+        )
+
+    def test_05_stale_title_save(self, admin_client, user_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        stale = Title.objects.get(pk=title_id)
+        response = create_single_review(user_client, title_id, 'Хорошо', 8)
+        stale.name = 'Новое название'
+        stale.save()
+        title = Title.objects.get(pk=title_id)
+        assert (title.name, title.review_count, title.rating) == (
+            'Новое название', 1, 8
+        ), (
+            'Сохранение устаревшего объекта произведения не должно '
+            'перезаписывать счётчики отзывов.'
+        )
+        assert (stale.review_count, stale.rating) == (1, 8), (
+            'После сохранения счётчики произведения должны перечитываться.'
+        )
+        review_id = response.json()['id']
+        response = user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/',
+            data={'score': 4}
+        )
+        assert response.status_code == 200
+        assert Title.objects.get(pk=title_id).rating == 4
+
+    def test_06_stale_review_saves(self, admin_client, user_client):
+        from reviews.models import Review, Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        response = create_single_review(user_client, title_id, 'Хорошо', 5)
+        first = Review.objects.get(pk=response.json()['id'])
+        second = Review.objects.get(pk=response.json()['id'])
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating, title.score_histogram[5],
+                title.score_histogram[7], title.score_histogram[9]) == (
+            9, 0, 0, 1
+        ), (
+            'Изменение оценки должно учитывать сохранённую оценку, '
+            'а не загруженную вместе с объектом.'
+        )
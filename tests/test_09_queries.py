@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments, create_titles
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09Queries:
+
+    def test_01_title_list_no_n_plus_one(self, admin_client, client):
+        create_titles(admin_client)
+        url = '/api/v1/titles/'
+        queries_before = count_queries(client, url)
+        admin_client.post(url, data={
+            'name': 'Чужой',
+            'year': 1979,
+            'genre': ['horror', 'drama'],
+            'category': 'films',
+            'description': 'In space no one can hear you scream'
+        })
+        assert count_queries(client, url) == queries_before, (
+            f'Проверьте, что количество запросов к БД при GET-запросе к '
+            f'`{url}` не зависит от количества произведений.'
+        )
+
+    def test_02_review_and_comment_list_no_n_plus_one(
+            self, admin_client, admin, user_client, user, client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        reviews_before = count_queries(client, reviews_url)
+        comments_before = count_queries(client, comments_url)
+
+        user_client.post(reviews_url, data={'text': 'Ещё', 'score': 3})
+        user_client.post(comments_url, data={'text': 'Согласен'})
+        assert count_queries(client, reviews_url) == reviews_before, (
+            f'Проверьте, что количество запросов к БД при GET-запросе к '
+            f'`{reviews_url}` не зависит от количества отзывов.'
+        )
+        assert count_queries(client, comments_url) == comments_before, (
+            f'Проверьте, что количество запросов к БД при GET-запросе к '
+            f'`{comments_url}` не зависит от количества комментариев.'
+        )
+
+    def test_03_nested_detail_single_query(self, admin_client, admin,
+                                           client,
+                                           django_assert_num_queries):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        review_url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        )
+        comment_url = f'{review_url}comments/{comments[0]["id"]}/'
+        for url in (review_url, comment_url):
+            # The version for the ETag and the object with its author.
+            with django_assert_num_queries(2):
+                response = client.get(url)
+            assert response.json()['author'] == admin.username, (
+                f'Проверьте, что GET-запрос к `{url}` загружает объект '
+                'вместе с автором одним запросом.'
+            )
+        assert client.get(
+            f'/api/v1/titles/{titles[0]["id"] + 100}/reviews/'
+        ).status_code == 404
+        assert client.get(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}/'
+            'comments/'
+        ).status_code == 404
+
+    def test_04_review_for_missing_title_in_outer_transaction(
+            self, user_client):
+        from reviews.models import Review
+
+        connection.settings_dict['ATOMIC_REQUESTS'] = True
+        try:
+            response = user_client.post(
+                '/api/v1/titles/999/reviews/',
+                data={'text': 'Текст', 'score': 5}
+            )
+        finally:
+            connection.settings_dict['ATOMIC_REQUESTS'] = False
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв к несуществующему произведению '
+            'отклоняется и внутри внешней транзакции.'
+        )
+        assert not Review.objects.exists()
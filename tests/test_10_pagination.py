@@ -0,0 +1,168 @@
+import json
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_genre, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10KeysetPagination:
+    url = '/api/v1/titles/'
+
+    def create_titles(self, admin_client, count):
+        create_genre(admin_client)
+        admin_client.post('/api/v1/categories/',
+                          data={'name': 'Фильм', 'slug': 'films'})
+        for number in range(count):
+            admin_client.post(self.url, data={
+                'name': f'Фильм {number}',
+                'year': 2000,
+                'genre': ['drama'],
+                'category': 'films',
+                'description': 'Описание'
+            })
+
+    def collect(self, client, url, link='next'):
+        names = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data, (
+                'Ответ с курсорной пагинацией не должен содержать `count`.'
+            )
+            page = [title['name'] for title in data['results']]
+            names.extend(page if link == 'next' else reversed(page))
+            url = data[link]
+        return names
+
+    def test_01_cursor_walks_all_pages(self, admin_client, client):
+        self.create_titles(admin_client, 12)
+        expected = [f'Фильм {number}' for number in range(12)]
+
+        names = self.collect(client, f'{self.url}?cursor=')
+        assert names == expected, (
+            f'Проверьте, что `{self.url}?cursor=` позволяет пройти по всем '
+            'произведениям по ссылкам `next`.'
+        )
+
+        last_page = client.get(f'{self.url}?cursor=').json()
+        while last_page['next']:
+            last_page = client.get(last_page['next']).json()
+        names = self.collect(client, last_page['previous'], link='previous')
+        assert list(reversed(names)) == expected[:10], (
+            'Проверьте, что ссылки `previous` курсорной пагинации '
+            'возвращают предыдущие страницы.'
+        )
+
+    def test_02_cursor_is_stable_under_inserts(self, admin_client, client):
+        self.create_titles(admin_client, 6)
+        first_page = client.get(f'{self.url}?cursor=').json()
+        admin_client.post(self.url, data={
+            'name': 'Новый фильм',
+            'year': 2001,
+            'genre': ['drama'],
+            'category': 'films',
+            'description': 'Описание'
+        })
+        names = self.collect(client, first_page['next'])
+        assert names == ['Фильм 5', 'Новый фильм']
+
+    def test_03_page_number_format_kept(self, admin_client, client):
+        self.create_titles(admin_client, 6)
+        data = client.get(f'{self.url}?page=2').json()
+        assert data['count'] == 6
+        assert len(data['results']) == 1
+
+    def test_04_invalid_cursor(self, client):
+        response = client.get(f'{self.url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        cursor = urlsafe_b64encode(
+            json.dumps([False, [10 ** 30]]).encode()
+        ).decode()
+        response = client.get(f'{self.url}?cursor={cursor}')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что курсор со значением вне диапазона поля '
+            'возвращает ответ со статусом 404.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10CachedCount:
+    url = '/api/v1/titles/'
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            data = client.get(url).json()
+        return data, [query['sql'] for query in context.captured_queries
+                      if 'COUNT(' in query['sql']]
+
+    def test_01_count_is_cached_and_invalidated(self, admin_client, client):
+        create_titles(admin_client)
+        data, _ = self.count_queries(client, self.url)
+        assert (data['count'], data['count_exact']) == (2, True), (
+            f'Проверьте, что ответ на GET-запрос к `{self.url}` содержит '
+            'точное количество объектов и флаг `count_exact`.'
+        )
+        _, count_queries = self.count_queries(client, self.url)
+        assert not count_queries, (
+            'Проверьте, что количество объектов берётся из кэша.'
+        )
+
+        admin_client.delete(f'{self.url}{data["results"][0]["id"]}/')
+        data, _ = self.count_queries(client, self.url)
+        assert data['count'] == 1, (
+            'Проверьте, что кэш количества объектов сбрасывается при '
+            'удалении объекта.'
+        )
+        data, _ = self.count_queries(client, f'{self.url}?genre=drama')
+        assert data['count'] == 1
+
+    def test_02_count_is_estimated_above_limit(self, admin_client, client,
+                                               settings):
+        settings.PAGINATION_EXACT_COUNT_LIMIT = 1
+        create_titles(admin_client)
+        data = client.get(self.url).json()
+        assert data['count_exact'] is False
+        assert data['count'] >= 2
+
+    def test_03_count_tables_include_subqueries(self):
+        from api.counts import read_tables
+        from reviews.models import GenreTitle, Title
+        queryset = Title.objects.filter(id__in=GenreTitle.objects.filter(
+            genre_id__in=[1]
+        ).values('title_id'))
+        assert read_tables(queryset) == (
+            GenreTitle._meta.db_table, Title._meta.db_table
+        ), (
+            'Проверьте, что версия количества зависит и от таблиц, '
+            'прочитанных в подзапросах фильтров.'
+        )
+
+    def test_04_count_versions_are_shared(self, admin_client, client):
+        from reviews.models import CacheVersion, Title
+        create_titles(admin_client)
+        assert client.get(self.url).json()['count'] == 2
+        assert CacheVersion.objects.filter(
+            name=f'table:{Title._meta.db_table}'
+        ).exists(), (
+            'Версии таблиц должны храниться в базе данных, '
+            'общей для всех процессов.'
+        )
+
+    def test_05_unlisted_models_keep_versions(self, client):
+        from reviews.models import CacheVersion
+
+        client.post('/api/v1/auth/signup/', data={
+            'username': 'new_user', 'email': 'new_user@yamdb.fake'
+        })
+        names = set(CacheVersion.objects.values_list('name', flat=True))
+        assert not {'table:reviews_outgoingemail',
+                    'table:reviews_cacheversion'} & names, (
+            'Записи в таблицы, которые не выводятся списками, не должны '
+            'менять версии таблиц.'
+        )
@@ -0,0 +1,141 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11TitleSearch:
+    url = '/api/v1/titles/'
+
+    def search(self, client, text):
+        response = client.get(self.url, {'search': text})
+        assert response.status_code == HTTPStatus.OK
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_search_name_and_description(self, admin_client, client):
+        create_titles(admin_client)
+        assert self.search(client, 'терминатор') == ['Терминатор'], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.url}` ищет '
+            'по названию произведения.'
+        )
+        assert self.search(client, 'yippie') == ['Крепкий орешек'], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.url}` ищет '
+            'по описанию произведения.'
+        )
+        assert self.search(client, 'несуществующее') == []
+
+    def test_02_index_follows_title_writes(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(f'{self.url}{titles[0]["id"]}/',
+                           data={'name': 'Хищник'})
+        assert self.search(client, 'терминатор') == []
+        assert self.search(client, 'хищник') == ['Хищник']
+
+        admin_client.delete(f'{self.url}{titles[0]["id"]}/')
+        assert self.search(client, 'хищник') == []
+
+    def test_03_search_is_ranked(self, admin_client, client):
+        create_titles(admin_client)
+        admin_client.post(self.url, data={
+            'name': 'Орешек знаний',
+            'year': 2000,
+            'genre': ['drama'],
+            'category': 'films',
+            'description': 'Крепкий орешек, крепкий орешек и ещё орешек'
+        })
+        assert self.search(client, 'крепкий орешек') == [
+            'Орешек знаний', 'Крепкий орешек'
+        ]
+
+    def test_04_rebuild_command(self, admin_client, client):
+        from django.db import connection
+
+        create_titles(admin_client)
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM reviews_title_fts')
+        assert self.search(client, 'терминатор') == []
+        call_command('rebuild_search_index')
+        assert self.search(client, 'терминатор') == ['Терминатор']
+
+    def test_05_search_is_paginated_in_sql(self, client):
+        from reviews.models import Title
+        for number in range(12):
+            Title.objects.create(name=f'Орешек {number}', year=2000,
+                                 description='')
+        response = client.get(self.url, {'search': 'орешек', 'page': 3})
+        data = response.json()
+        assert data['count'] == 12
+        assert [title['name'] for title in data['results']] == [
+            'Орешек 10', 'Орешек 11'
+        ], (
+            'Проверьте, что результаты поиска не обрезаются и '
+            'пагинируются вместе с запросом к индексу.'
+        )
+
+    def test_06_availability_is_rechecked(self):
+        from django.db import connection
+        from reviews.models import Title
+        from reviews.search import SearchIndex
+
+        index = SearchIndex(Title, ('name',), 'reviews_test_fts')
+        assert not index.is_available()
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE VIRTUAL TABLE reviews_test_fts '
+                           'USING fts5(name)')
+        try:
+            assert index.is_available(), (
+                'Отсутствие таблицы индекса не должно кэшироваться.'
+            )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TABLE reviews_test_fts')
+
+    def test_07_inflected_forms_match(self, admin_client, client):
+        create_titles(admin_client)
+        admin_client.post(self.url, data={
+            'name': 'Побег из Шоушенка',
+            'year': 1994,
+            'genre': ['drama'],
+            'category': 'films',
+            'description': 'Бухгалтер готовит побег из тюрьмы'
+        })
+        for query in ('побег', 'побега', 'ПОБЕГОМ', 'шоушенке'):
+            assert self.search(client, query) == ['Побег из Шоушенка'], (
+                'Проверьте, что поиск находит произведения по разным '
+                f'словоформам: запрос `{query}`.'
+            )
+
+    def test_08_review_search(self, admin_client, user_client,
+                              moderator_client, client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'],
+                             'Ёлки, какие спецэффекты!', 9)
+        create_single_review(moderator_client, titles[0]['id'],
+                             'Скучный сюжет', 3)
+        create_single_review(user_client, titles[1]['id'],
+                             'Спецэффектов нет', 5)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url, {'search': 'елка спецэффект'})
+        assert [review['text'] for review in response.json()['results']] == [
+            'Ёлки, какие спецэффекты!'
+        ], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` ищет по '
+            'тексту отзывов произведения с учётом словоформ.'
+        )
+        response = client.get(url, {'search': str(titles[0]['id'])})
+        assert response.json()['results'] == [], (
+            'Запрос не должен совпадать с идентификатором произведения, '
+            'по которому ограничивается поиск.'
+        )
+
+    def test_09_review_scope_is_matched_by_index(self):
+        from reviews.search import review_index
+        assert review_index.build_query('Ёлки', title_id=3) == (
+            'title_id : "3" AND {text} : ("елк"*)'
+        ), (
+            'Проверьте, что ограничение поиска отзывов по произведению '
+            'входит в запрос к полнотекстовому индексу.'
+        )
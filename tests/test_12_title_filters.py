@@ -0,0 +1,78 @@
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleFilters:
+    url = '/api/v1/titles/'
+
+    def names(self, client, query):
+        response = client.get(f'{self.url}?{query}')
+        assert response.status_code == 200, (
+            f'Проверьте, что GET-запрос к `{self.url}?{query}` '
+            'возвращает ответ со статусом 200.'
+        )
+        return sorted(title['name'] for title in response.json()['results'])
+
+    def test_01_exact_and_prefix_slugs(self, admin_client, client):
+        create_titles(admin_client)
+        assert self.names(client, 'genre=horror') == ['Терминатор']
+        assert self.names(client, 'genre=hor') == [], (
+            'Фильтр `genre` должен сравнивать slug жанра целиком.'
+        )
+        assert self.names(client, 'genre_prefix=hor') == ['Терминатор']
+        assert self.names(client, 'category=books') == ['Крепкий орешек']
+        assert self.names(client, 'category_prefix=f') == ['Терминатор']
+        assert self.names(client, 'category=missing') == []
+
+    def test_02_multiple_genres(self, admin_client, client):
+        create_titles(admin_client)
+        assert self.names(client, 'genre=comedy,drama') == [
+            'Крепкий орешек', 'Терминатор'
+        ], 'По умолчанию фильтр `genre` должен объединять жанры через ИЛИ.'
+        assert self.names(client, 'genre=horror,comedy&genre_match=all') == [
+            'Терминатор'
+        ], 'С `genre_match=all` произведение должно иметь все жанры.'
+        assert self.names(client, 'genre=horror,drama&genre_match=all') == []
+        assert self.names(client, 'genre=horror,missing&genre_match=all') == []
+
+    def test_03_year_filters(self, admin_client, client):
+        create_titles(admin_client)
+        assert self.names(client, 'year=1984') == ['Терминатор']
+        assert self.names(client, 'year=198') == [], (
+            'Фильтр `year` должен сравнивать год целиком.'
+        )
+        assert self.names(client, 'year_min=1985') == ['Крепкий орешек']
+        assert self.names(client, 'year_max=1985') == ['Терминатор']
+        assert self.names(client, 'year_min=1980&year_max=1990') == [
+            'Крепкий орешек', 'Терминатор'
+        ]
+        assert self.names(client, 'decade=1980') == [
+            'Крепкий орешек', 'Терминатор'
+        ]
+        assert self.names(client, 'decade=1990') == []
+        assert self.names(client, 'category=films&decade=1980') == [
+            'Терминатор'
+        ]
+
+    def test_04_internal_fields_are_not_filters(self, admin_client, client):
+        create_titles(admin_client)
+        for query in ('rating=1', 'review_count=1', 'score_sum=1',
+                      'score_5_count=1', 'version=99', 'description=none'):
+            assert self.names(client, query) == [
+                'Крепкий орешек', 'Терминатор'
+            ], (
+                f'Параметр `{query}` не должен фильтровать произведения: '
+                'служебные поля модели не являются фильтрами.'
+            )
+
+    def test_05_invalid_years(self, admin_client, client):
+        create_titles(admin_client)
+        for query in ('year=1e30', 'year_min=99999999999999999999999',
+                      'year_max=-1', 'decade=1980.5', 'year=abc'):
+            response = client.get(f'{self.url}?{query}')
+            assert response.status_code == 400, (
+                f'Проверьте, что GET-запрос к `{self.url}?{query}` '
+                'возвращает ответ со статусом 400.'
+            )
@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_genre, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13CatalogCache:
+
+    def test_01_lists_served_from_cache(self, admin_client, client,
+                                        django_assert_num_queries):
+        genres = create_genre(admin_client)
+        client.get('/api/v1/genres/')
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/genres/')
+        assert response.json()['results'] == genres, (
+            'Проверьте, что список жанров отдаётся из кэша без запросов к БД.'
+        )
+
+        data = {'name': 'Рок', 'slug': 'rock'}
+        admin_client.post('/api/v1/genres/', data=data)
+        response = client.get('/api/v1/genres/?search=рок')
+        assert response.json()['results'] == [data], (
+            'Проверьте, что кэш жанров сбрасывается при создании жанра и '
+            'поиск по названию работает.'
+        )
+        admin_client.delete('/api/v1/genres/rock/')
+        assert data not in client.get('/api/v1/genres/').json()['results']
+
+    def test_02_version_change_reloads_cache(self, admin_client, client,
+                                             settings):
+        from reviews.catalog import VERSION_NAME
+        from reviews.models import Category
+        from reviews.versions import bump_version
+
+        settings.CATALOG_CACHE_CHECK_INTERVAL = 0
+        create_titles(admin_client)
+        client.get('/api/v1/categories/')
+        Category.objects.filter(slug='films').update(name='Кино')
+        assert client.get('/api/v1/categories/').json()['results'][0][
+            'name'] == 'Фильм'
+
+        bump_version(VERSION_NAME)
+        assert client.get('/api/v1/categories/').json()['results'][0][
+            'name'] == 'Кино', (
+            'Проверьте, что кэш каталога перезагружается при изменении '
+            'версии в БД другим процессом.'
+        )
+
+    def test_03_titles_use_cached_catalog(self, admin_client, client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post('/api/v1/titles/', data={
+                'name': 'Чужой',
+                'year': 1979,
+                'genre': ['horror', 'drama'],
+                'category': 'films',
+                'description': 'Космос'
+            })
+        assert response.status_code == 201
+        assert not [
+            query['sql'] for query in context.captured_queries
+            if '"slug" = ' in query['sql'] or '"slug" IN' in query['sql']
+        ], 'Проверьте, что slug жанров и категорий берутся из кэша каталога.'
+
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/')
+        assert not [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_genre"' in query['sql']
+            or '"reviews_category"' in query['sql']
+        ], (
+            'Проверьте, что жанры и категории произведений берутся из кэша '
+            'каталога.'
+        )
+
+    def test_04_unknown_slug_keeps_cache(self, admin_client):
+        create_titles(admin_client)
+        admin_client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post('/api/v1/titles/', data={
+                'name': 'Чужой',
+                'year': 1979,
+                'genre': ['horror'],
+                'category': 'unknown',
+                'description': 'Космос'
+            })
+        assert response.status_code == 400
+        assert not [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_genre"' in query['sql']
+            or '"reviews_category"' in query['sql']
+        ], (
+            'Проверьте, что неизвестный slug не перезагружает каталог, '
+            'если его версия не изменилась.'
+        )
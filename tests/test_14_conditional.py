@@ -0,0 +1,198 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import (create_single_comment, create_single_review,
+                         create_titles)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14ConditionalGet:
+
+    def assert_not_modified(self, client, url, message):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.has_header('ETag'), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит ETag.'
+        )
+        assert response.has_header('Last-Modified')
+        repeated = client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert repeated.status_code == HTTPStatus.NOT_MODIFIED, message
+        return response['ETag']
+
+    def assert_modified(self, client, url, etag, message):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, message
+        return response['ETag']
+
+    def test_01_title(self, admin_client, user_client, client,
+                      django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = self.assert_not_modified(
+            client, url,
+            'Проверьте, что повторный запрос произведения с If-None-Match '
+            'возвращает 304.'
+        )
+        with django_assert_num_queries(1):
+            client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        create_single_review(user_client, titles[0]['id'], 'Текст', 7)
+        etag = self.assert_modified(
+            client, url, etag,
+            'Проверьте, что ETag произведения меняется при новом отзыве.'
+        )
+        admin_client.patch(url, data={'genre': ['drama']})
+        etag = self.assert_modified(
+            client, url, etag,
+            'Проверьте, что ETag произведения меняется при смене жанров.'
+        )
+        from reviews.models import Category
+
+        category = Category.objects.get(slug='films')
+        category.name = 'Кино'
+        category.save()
+        self.assert_modified(
+            client, url, etag,
+            'Проверьте, что ETag произведения меняется при изменении '
+            'категории.'
+        )
+        assert client.get(
+            '/api/v1/titles/0/', HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_title_list(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/?year=1984'
+        etag = self.assert_not_modified(
+            client, url,
+            'Проверьте, что повторный запрос списка произведений с '
+            'If-None-Match возвращает 304.'
+        )
+        other = client.get('/api/v1/titles/?year=1988')
+        assert other['ETag'] != etag, (
+            'Проверьте, что ETag списка зависит от параметров запроса.'
+        )
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Чужой'}
+        )
+        self.assert_modified(
+            client, url, etag,
+            'Проверьте, что ETag списка меняется при изменении произведения.'
+        )
+
+    def test_03_title_list_after_delete(self, admin_client, client,
+                                        django_assert_num_queries):
+        from django.db.models import F
+        from reviews.models import CacheVersion
+
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        etag = self.assert_not_modified(
+            client, url,
+            'Проверьте, что повторный запрос списка произведений с '
+            'If-None-Match возвращает 304.'
+        )
+        # Only the table versions are read, titles are not scanned.
+        with django_assert_num_queries(1):
+            client.get(url, HTTP_IF_NONE_MATCH=etag)
+        # Last-Modified has a one second resolution.
+        CacheVersion.objects.update(
+            modified=F('modified') - timedelta(seconds=2)
+        )
+        last_modified = client.get(url)['Last-Modified']
+
+        admin_client.delete(f'{url}{titles[1]["id"]}/')
+        self.assert_modified(
+            client, url, etag,
+            'Проверьте, что ETag списка меняется при удалении произведения.'
+        )
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после удаления произведения запрос списка '
+            'с If-Modified-Since не возвращает 304.'
+        )
+
+    def test_04_saved_version_is_loaded(self, admin_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        title.name = 'Чужой'
+        title.save()
+        assert title.version == Title.objects.get(pk=title.pk).version, (
+            'Проверьте, что после сохранения объекта его версия '
+            'загружается из базы данных.'
+        )
+
+    def test_05_reviews_and_comments(self, admin_client, user_client,
+                                     moderator_client, client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = create_single_review(
+            user_client, title_id, 'Отзыв', 5
+        ).json()['id']
+        reviews_url = f'/api/v1/titles/{title_id}/reviews/'
+        review_url = f'{reviews_url}{review_id}/'
+        comments_url = f'{review_url}comments/'
+
+        list_etag = self.assert_not_modified(
+            client, reviews_url,
+            'Проверьте, что повторный запрос списка отзывов с '
+            'If-None-Match возвращает 304.'
+        )
+        review_etag = self.assert_not_modified(
+            client, review_url,
+            'Проверьте, что повторный запрос отзыва с If-None-Match '
+            'возвращает 304.'
+        )
+        comments_etag = self.assert_not_modified(
+            client, comments_url,
+            'Проверьте, что повторный запрос списка комментариев с '
+            'If-None-Match возвращает 304.'
+        )
+
+        comment_id = create_single_comment(
+            moderator_client, title_id, review_id, 'Комментарий'
+        ).json()['id']
+        review_etag = self.assert_modified(
+            client, review_url, review_etag,
+            'Проверьте, что ETag отзыва меняется при новом комментарии.'
+        )
+        self.assert_modified(
+            client, comments_url, comments_etag,
+            'Проверьте, что ETag списка комментариев меняется при новом '
+            'комментарии.'
+        )
+        comment_url = f'{comments_url}{comment_id}/'
+        comment_etag = self.assert_not_modified(
+            client, comment_url,
+            'Проверьте, что повторный запрос комментария с If-None-Match '
+            'возвращает 304.'
+        )
+
+        user_client.patch(review_url, data={'text': 'Новый текст'})
+        self.assert_modified(
+            client, reviews_url, list_etag,
+            'Проверьте, что ETag списка отзывов меняется при изменении '
+            'отзыва.'
+        )
+        self.assert_modified(
+            client, review_url, review_etag,
+            'Проверьте, что ETag отзыва меняется при его изменении.'
+        )
+        moderator_client.patch('/api/v1/users/me/', data={'bio': 'Био'})
+        assert client.get(
+            comment_url, HTTP_IF_NONE_MATCH=comment_etag
+        ).status_code == HTTPStatus.NOT_MODIFIED
+        moderator_client.patch(
+            '/api/v1/users/me/', data={'username': 'new_moderator'}
+        )
+        self.assert_modified(
+            client, comment_url, comment_etag,
+            'Проверьте, что ETag комментария меняется при смене имени '
+            'автора.'
+        )
@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15CachedJWTAuthentication:
+
+    def get_client(self, user):
+        from api.authentication import access_token_for
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}'
+        )
+        return client
+
+    def user_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        return response, [query['sql'] for query in context.captured_queries
+                          if '"reviews_user"' in query['sql']]
+
+    def test_01_user_is_not_loaded(self, admin):
+        client = self.get_client(admin)
+        client.get('/api/v1/users/')
+        response, queries = self.user_queries(client, '/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert not queries, (
+            'Проверьте, что пользователь с актуальным токеном не '
+            'загружается из БД при каждом запросе.'
+        )
+
+    def test_02_role_change_outdates_token(self, admin):
+        client = self.get_client(admin)
+        assert client.get('/api/v1/users/').status_code == HTTPStatus.OK
+        admin.role = 'user'
+        admin.save()
+        assert client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), (
+            'Проверьте, что после смены роли права пользователя '
+            'определяются по роли из БД.'
+        )
+
+    def test_03_inactive_user_is_rejected(self, user):
+        client = self.get_client(user)
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'Проверьте, что заблокированный пользователь не авторизуется.'
+
+    def test_04_own_profile_is_saved_completely(self, user):
+        client = self.get_client(user)
+        client.get('/api/v1/titles/')
+        response = client.patch('/api/v1/users/me/', data={'bio': 'Новое'})
+        assert response.status_code == HTTPStatus.OK
+        user.refresh_from_db()
+        assert (user.bio, user.email) == ('Новое', 'testuser@yamdb.fake')
@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def issue_client(user):
+    from api.authentication import access_token_for
+    from api.revocation import record_issued_token
+
+    token = access_token_for(user)
+    record_issued_token(user, token)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, token
+
+
+def test_bloom_filter():
+    from api.revocation import BloomFilter
+
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f'key-{number}' for number in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f'other-{number}' in bloom
+                          for number in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TokenRevocation:
+
+    def test_01_demoted_user_tokens_are_revoked(self, admin_client,
+                                                moderator):
+        client, _ = issue_client(moderator)
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+        admin_client.patch(
+            f'/api/v1/users/{moderator.username}/', data={'role': 'user'}
+        )
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), (
+            'Проверьте, что при понижении роли пользователя его токены '
+            'отзываются.'
+        )
+
+    def test_02_deleted_user_tokens_are_revoked(self, admin_client, user):
+        from reviews.models import RevokedToken
+
+        _, token = issue_client(user)
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert RevokedToken.objects.filter(jti=token['jti']).exists(), (
+            'Проверьте, что при удалении пользователя его токены отзываются.'
+        )
+
+    def test_03_revocations_of_other_workers(self, user, settings):
+        from api.revocation import expiration_time
+        from reviews.models import RevokedToken
+
+        settings.TOKEN_REVOCATION_REFRESH_INTERVAL = 3600
+        client, token = issue_client(user)
+        client.get('/api/v1/users/me/')
+        with CaptureQueriesContext(connection) as context:
+            assert client.get('/api/v1/users/me/').status_code == (
+                HTTPStatus.OK
+            )
+        assert not [
+            query for query in context.captured_queries
+            if '"reviews_revokedtoken"' in query['sql']
+        ], 'Проверьте, что неотозванный токен проверяется без запроса к БД.'
+
+        RevokedToken.objects.create(
+            jti=token['jti'], expires_at=expiration_time(token)
+        )
+        settings.TOKEN_REVOCATION_REFRESH_INTERVAL = 0
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+
+    def test_04_late_committed_revocations(self, user, settings):
+        from datetime import timedelta
+
+        from api.revocation import expiration_time, revocation_list
+        from django.utils import timezone
+        from reviews.models import RevokedToken
+
+        settings.TOKEN_REVOCATION_REFRESH_INTERVAL = 0
+        client, token = issue_client(user)
+        RevokedToken.objects.create(
+            id=10, jti='other', expires_at=expiration_time(token)
+        )
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+        # A transaction that started earlier commits a lower id later.
+        RevokedToken.objects.create(
+            id=5, jti=token['jti'], expires_at=expiration_time(token),
+            revoked_at=timezone.now() - timedelta(seconds=5)
+        )
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), (
+            'Проверьте, что отзыв токена, записанный транзакцией '
+            'с меньшим id после обновления фильтра, не теряется.'
+        )
+        assert revocation_list._recent.keys() == {5, 10}
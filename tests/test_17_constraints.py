@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17UniqueConstraints:
+
+    def test_01_duplicate_review(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            create_single_review(user_client, titles[0]['id'], 'Текст', 5)
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and '"reviews_review"' in query['sql']
+        ], (
+            'Проверьте, что при создании отзыва уникальность проверяется '
+            'ограничением БД, без предварительного запроса.'
+        )
+        response = user_client.post(url, data={'text': 'Снова', 'score': 6})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {
+            'non_field_errors': ['Отзыв можно оставить только один раз!']
+        }
+
+    def test_02_duplicate_slug_and_user(self, admin_client, admin):
+        admin_client.post('/api/v1/genres/', data={'name': 'Рок',
+                                                   'slug': 'rock'})
+        response = admin_client.post('/api/v1/genres/', data={
+            'name': 'Рок-н-ролл', 'slug': 'rock'
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert list(response.json()) == ['slug']
+
+        response = admin_client.post('/api/v1/users/', data={
+            'username': 'new_user', 'email': admin.email
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert list(response.json()) == ['email'], (
+            'Проверьте, что занятый email возвращает ошибку поля `email`.'
+        )
+
+    def test_03_signup_single_user_lookup(self, client, django_user_model):
+        from api.serializers import RegisterDataSerializer
+
+        data = {'username': 'new_user', 'email': 'new_user@yamdb.fake'}
+        client.post('/api/v1/auth/signup/', data=data)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert len([
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and '"reviews_user"' in query['sql']
+        ]) == 1, (
+            'Проверьте, что при регистрации пользователь ищется по имени '
+            'и почте одним запросом.'
+        )
+
+        data = {'username': 'racer', 'email': 'racer@yamdb.fake'}
+        serializer = RegisterDataSerializer(data=data)
+        assert serializer.is_valid()
+        created = django_user_model.objects.create(**data)
+        assert serializer.save() == created, (
+            'Проверьте, что одновременная регистрация с теми же данными '
+            'возвращает уже созданного пользователя.'
+        )
@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+
+
+class CountingBackend(EmailBackend):
+    connections = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingBackend.connections += 1
+
+
+class CheckingBackend(EmailBackend):
+    """Fails the second message, checks no transaction is held."""
+    calls = 0
+    states = []
+
+    def send_messages(self, messages):
+        from django.db import connection
+        from django.utils import timezone
+        from reviews.models import OutgoingEmail
+
+        CheckingBackend.calls += 1
+        CheckingBackend.states.append((
+            connection.in_atomic_block,
+            OutgoingEmail.objects.filter(
+                next_attempt_at__lte=timezone.now()
+            ).exists()
+        ))
+        if CheckingBackend.calls == 2:
+            raise ConnectionError('Recipient refused')
+        return super().send_messages(messages)
+
+
+class FailingBackend(EmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('Mail server is down')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18EmailOutbox:
+    url_signup = '/api/v1/auth/signup/'
+
+    def signup(self, client, number):
+        response = client.post(self.url_signup, data={
+            'email': f'user{number}@yamdb.fake',
+            'username': f'user{number}'
+        })
+        assert response.status_code == HTTPStatus.OK
+
+    def test_01_signup_queues_email(self, client, settings):
+        from reviews.models import OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_18_outbox.CountingBackend'
+        CountingBackend.connections = 0
+        outbox_before_count = len(mail.outbox)
+        for number in range(3):
+            self.signup(client, number)
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что письмо с кодом подтверждения ставится в '
+            'очередь, а не отправляется во время запроса.'
+        )
+        assert OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING
+        ).count() == 3
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == outbox_before_count + 3
+        assert CountingBackend.connections == 1, (
+            'Проверьте, что письма отправляются пачкой через одно '
+            'соединение.'
+        )
+        assert not OutgoingEmail.objects.exclude(
+            status=OutgoingEmail.SENT
+        ).exists()
+
+    def test_02_retries_and_dead_letters(self, client, settings):
+        from reviews.models import OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_18_outbox.FailingBackend'
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 3
+        self.signup(client, 1)
+        call_command('send_outbox')
+        message = OutgoingEmail.objects.get()
+        assert (message.status, message.attempts) == (
+            OutgoingEmail.PENDING, 1
+        ), 'Проверьте, что неотправленное письмо остаётся в очереди.'
+        assert 'Mail server is down' in message.last_error
+
+        settings.EMAIL_OUTBOX_RETRY_DELAY = 0
+        OutgoingEmail.objects.update(next_attempt_at=message.created)
+        call_command('send_outbox')
+        message.refresh_from_db()
+        assert (message.status, message.attempts) == (
+            OutgoingEmail.DEAD, 3
+        ), (
+            'Проверьте, что после исчерпания попыток письмо помечается '
+            'как недоставленное.'
+        )
+
+    def test_03_partial_failure_and_lease(self, client, settings):
+        from reviews.models import OutgoingEmail
+
+        settings.EMAIL_BACKEND = 'tests.test_18_outbox.CheckingBackend'
+        CheckingBackend.calls = 0
+        CheckingBackend.states = []
+        outbox_before_count = len(mail.outbox)
+        for number in range(3):
+            self.signup(client, number)
+        call_command('send_outbox')
+        assert CheckingBackend.states == [(False, False)] * 3, (
+            'Проверьте, что письма отправляются вне транзакции, а '
+            'отправляемые письма скрыты от других обработчиков.'
+        )
+        assert len(mail.outbox) == outbox_before_count + 2
+        assert list(OutgoingEmail.objects.values_list(
+            'status', flat=True
+        )) == [OutgoingEmail.SENT, OutgoingEmail.PENDING,
+               OutgoingEmail.SENT], (
+            'Проверьте, что при сбое части пачки повторно отправляются '
+            'только неотправленные письма.'
+        )
@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+def set_rates(settings, **rates):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': rates,
+    }
+
+
+def test_bucket_store(tmp_path):
+    from api.throttling import BucketStore
+
+    store = BucketStore(str(tmp_path / 'buckets.sqlite3'))
+    assert store.consume('key', 2, 0.01) == 0
+    assert store.consume('key', 2, 0.01) == 0
+    assert store.consume('key', 2, 0.01) > 0, (
+        'Проверьте, что пустое ведро токенов отклоняет запрос.'
+    )
+    assert store.consume('other', 2, 0.01) == 0
+    assert BucketStore(store.path).consume('key', 2, 0.01) > 0, (
+        'Проверьте, что ведра токенов общие для процессов.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Throttling:
+
+    def test_01_signup_throttled_by_email(self, client, settings):
+        set_rates(settings, signup_email='2/hour', signup_ip='10/hour')
+        data = {'email': 'spam@yamdb.fake', 'username': 'spammer'}
+        for _ in range(2):
+            response = client.post('/api/v1/auth/signup/', data=data)
+            assert response.status_code == HTTPStatus.OK
+        response = client.post('/api/v1/auth/signup/', data={
+            'email': 'SPAM@yamdb.fake', 'username': 'other'
+        })
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что частота регистраций ограничена для одного email.'
+        )
+        assert int(response['Retry-After']) > 0
+        response = client.post('/api/v1/auth/signup/', data={
+            'email': 'other@yamdb.fake', 'username': 'other'
+        })
+        assert response.status_code == HTTPStatus.OK
+
+    def test_02_review_writes_throttled(self, admin_client, user_client,
+                                        settings):
+        titles, _, _ = create_titles(admin_client)
+        set_rates(settings, reviews_user='1/minute')
+        create_single_review(user_client, titles[0]['id'], 'Текст', 5)
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        response = user_client.post(url, data={'text': 'Ещё', 'score': 5})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что частота создания отзывов ограничена.'
+        )
+        assert user_client.get(url).status_code == HTTPStatus.OK, (
+            'Проверьте, что чтение отзывов не ограничивается.'
+        )
+
+    @pytest.mark.parametrize('url', ('/api/v1/auth/signup/',
+                                     '/api/v1/auth/token/'))
+    def test_03_non_object_data(self, client, settings, url):
+        set_rates(settings, signup_email='2/hour', signup_ip='10/hour',
+                  signup_username='2/hour', token_username='2/hour', token_ip='10/hour')
+        response = client.post(url, data=[{'email': 'spam@yamdb.fake'}],
+                               content_type='application/json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что запрос с массивом вместо объекта возвращает 400.'
+        )
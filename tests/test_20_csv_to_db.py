@@ -0,0 +1,410 @@
+import csv
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+def write_csv(path, name, rows):
+    with open(path / f'{name}.csv', 'w', encoding='utf-8', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    write_csv(tmp_path, 'users', [
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (100, 'reader', 'reader@yamdb.fake', 'user', '', '', ''),
+        (101, 'critic', 'critic@yamdb.fake', 'user', '', '', ''),
+    ])
+    write_csv(tmp_path, 'category', [
+        ('id', 'name', 'slug'), (1, 'Фильм', 'movie'),
+    ])
+    write_csv(tmp_path, 'genre', [
+        ('id', 'name', 'slug'), (1, 'Драма', 'drama'),
+    ])
+    write_csv(tmp_path, 'titles', [
+        ('id', 'name', 'year', 'category'),
+        (1, 'Побег из Шоушенка', 1994, 1),
+        (2, 'Крестный отец', 1972, 1),
+        (3, 'Без категории', 2000, ''),
+    ])
+    write_csv(tmp_path, 'genre_title', [
+        ('id', 'title_id', 'genre_id'), (1, 1, 1), (2, 2, 1),
+    ])
+    write_csv(tmp_path, 'review', [
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        (1, 1, 'Отлично', 100, 10, '2019-09-24T21:08:21.567Z'),
+        (2, 1, 'Хорошо', 101, 8, '2019-09-24T21:08:21.567Z'),
+        (3, 2, 'Скучно', 100, 3, '2019-09-24T21:08:21.567Z'),
+    ])
+    write_csv(tmp_path, 'comments', [
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        (1, 1, 'Согласен', 101, '2019-09-24T21:08:21.567Z'),
+    ])
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20CsvToDb:
+
+    def load(self, csv_dir, *tables, **options):
+        call_command('csv_to_db', *tables, path=csv_dir, stdout=StringIO(),
+                     **options)
+
+    def test_01_load_all(self, csv_dir):
+        from reviews.models import (Category, Comment, Genre, GenreTitle,
+                                    Review, Title, User)
+
+        self.load(csv_dir, 'all', batch_size=2)
+        assert (
+            User.objects.filter(pk__in=(100, 101)).count(),
+            Category.objects.count(), Genre.objects.count(),
+            Title.objects.count(), GenreTitle.objects.count(),
+            Review.objects.count(), Comment.objects.count()
+        ) == (2, 1, 1, 3, 2, 3, 1), (
+            'Команда `csv_to_db` должна загружать все строки CSV-файлов, '
+            'в том числе когда их больше размера пачки.'
+        )
+        assert Title.objects.get(pk=3).category is None, (
+            'Пустая категория в CSV должна загружаться как `None`.'
+        )
+        assert (Title.objects.get(pk=1).rating,
+                Title.objects.get(pk=2).rating) == (9, 3), (
+            'После загрузки отзывов команда `csv_to_db` должна '
+            'пересчитывать рейтинги произведений.'
+        )
+
+    def test_02_reload_skips_existing(self, csv_dir):
+        from reviews.models import Review, Title
+
+        self.load(csv_dir, 'all')
+        self.load(csv_dir, 'all')
+        assert (Title.objects.count(), Review.objects.count()) == (3, 3), (
+            'Повторный запуск `csv_to_db` не должен дублировать строки.'
+        )
+        title = Title.objects.create(name='Новое', year=2020)
+        assert title.pk > 3, (
+            'После загрузки новые объекты должны получать id '
+            'больше загруженных.'
+        )
+
+    def test_03_loaded_titles_are_searchable(self, csv_dir, admin_client):
+        self.load(csv_dir, 'all')
+        response = admin_client.get('/api/v1/titles/?search=побег')
+        assert [title['id'] for title in response.json()['results']] == [
+            1
+        ], 'После загрузки `csv_to_db` должен перестраивать поисковый индекс.'
+
+    def test_04_invalid_batch_size(self, csv_dir):
+        with pytest.raises(CommandError):
+            self.load(csv_dir, 'all', batch_size=0)
+
+    def test_05_reload_reports_inserted_rows(self, csv_dir):
+        self.load(csv_dir, 'all')
+        output = StringIO()
+        call_command('csv_to_db', 'review', path=csv_dir, stdout=output)
+        assert 'review: 0 rows' in output.getvalue(), (
+            'Команда `csv_to_db` должна сообщать количество действительно '
+            'добавленных строк.'
+        )
+        assert '3 existing skipped' in output.getvalue()
+
+    def test_06_missing_reference(self, csv_dir):
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (1, 1, 'Отлично', 100, 10, '2019-09-24T21:08:21.567Z'),
+            (2, 99, 'Нет такого произведения', 101, 8,
+             '2019-09-24T21:08:21.567Z'),
+        ])
+        with pytest.raises(CommandError) as error:
+            self.load(csv_dir, 'all')
+        message = str(error.value)
+        assert 'review.csv, ids 1-2' in message, (
+            'Ошибка внешнего ключа должна указывать таблицу и id строк.'
+        )
+        assert 'id 2 references a missing title 99' in message
+
+    @pytest.mark.parametrize('incremental', (False, True))
+    def test_07_dates_are_kept(self, csv_dir, incremental):
+        from reviews.models import Comment, Review
+
+        self.load(csv_dir, 'all', incremental=incremental)
+        assert {
+            date.isoformat()
+            for date in (*Review.objects.values_list('pub_date', flat=True),
+                         *Comment.objects.values_list('pub_date', flat=True))
+        } == {'2019-09-24T21:08:21.567000+00:00'}, (
+            'Даты публикации отзывов и комментариев должны загружаться '
+            'из CSV, а не заменяться текущим временем.'
+        )
+
+    def test_08_only_loaded_tables_are_rebuilt(self, csv_dir, monkeypatch):
+        from reviews.search import review_index, title_index
+
+        self.load(csv_dir, 'users', 'category', 'genre', 'titles')
+        rebuilt = []
+        for index in (title_index, review_index):
+            monkeypatch.setattr(
+                index, 'rebuild',
+                lambda batch_size, index=index: rebuilt.append(index.table)
+            )
+        self.load(csv_dir, 'review')
+        assert rebuilt == [review_index.table], (
+            'После загрузки отзывов должен перестраиваться только '
+            'поисковый индекс отзывов.'
+        )
+
+@pytest.mark.django_db(transaction=True)
+class Test20IncrementalCsvToDb:
+
+    def load(self, csv_dir, *tables, **options):
+        output = StringIO()
+        call_command('csv_to_db', *tables, path=csv_dir, incremental=True,
+                     stdout=output, **options)
+        return output.getvalue()
+
+    def test_01_unchanged_files_are_skipped(self, csv_dir):
+        from reviews.models import Review
+
+        self.load(csv_dir, 'all')
+        assert Review.objects.count() == 3, (
+            'Первый инкрементальный импорт должен загружать все строки.'
+        )
+        output = self.load(csv_dir, 'all')
+        assert output.count('unchanged') == 7, (
+            'Неизменённые файлы должны пропускаться при инкрементальном '
+            'импорте.'
+        )
+
+    def test_02_changed_rows_are_updated(self, csv_dir):
+        from reviews.models import Review, Title
+
+        self.load(csv_dir, 'all')
+        untouched_version = Review.objects.get(pk=2).version
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (1, 1, 'Пересмотрел, так себе', 100, 4,
+             '2019-09-24T21:08:21.567Z'),
+            (2, 1, 'Хорошо', 101, 8, '2019-09-24T21:08:21.567Z'),
+            (3, 2, 'Скучно', 100, 3, '2019-09-24T21:08:21.567Z'),
+            (4, 2, 'Классика', 101, 9, '2019-09-24T21:08:21.567Z'),
+        ])
+        output = self.load(csv_dir, 'review')
+        assert 'review: 2 rows' in output, (
+            'Инкрементальный импорт должен записывать только изменённые '
+            'и новые строки.'
+        )
+        review = Review.objects.get(pk=1)
+        assert (review.text, review.score) == ('Пересмотрел, так себе', 4), (
+            'Изменённая строка должна обновлять существующий объект.'
+        )
+        assert Review.objects.get(pk=2).version == untouched_version, (
+            'Неизменённые строки не должны перезаписываться.'
+        )
+        assert (Title.objects.get(pk=1).rating,
+                Title.objects.get(pk=2).rating) == (6, 6), (
+            'Рейтинги затронутых произведений должны пересчитываться.'
+        )
+
+    def test_03_delete_missing_rows(self, csv_dir):
+        from reviews.models import Comment, Review, Title
+
+        self.load(csv_dir, 'all')
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (2, 1, 'Хорошо', 101, 8, '2019-09-24T21:08:21.567Z'),
+            (3, 2, 'Скучно', 100, 3, '2019-09-24T21:08:21.567Z'),
+        ])
+        self.load(csv_dir, 'review')
+        assert Review.objects.filter(pk=1).exists(), (
+            'Без `--delete-missing` строки, удалённые из файла, '
+            'должны оставаться в базе.'
+        )
+        Title.objects.create(name='Создано через API', year=2020)
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (3, 2, 'Скучно', 100, 3, '2019-09-24T21:08:21.567Z'),
+        ])
+        self.load(csv_dir, 'review', 'titles', delete_missing=True)
+        assert list(Review.objects.values_list('pk', flat=True)) == [3], (
+            'С `--delete-missing` строки, удалённые из файла с прошлого '
+            'импорта, должны удаляться.'
+        )
+        assert not Comment.objects.exists(), (
+            'Удаление строк должно каскадно удалять зависимые объекты.'
+        )
+        assert Title.objects.get(pk=1).rating is None, (
+            'Рейтинг должен пересчитываться после удаления отзывов.'
+        )
+        assert Title.objects.count() == 4, (
+            '`--delete-missing` не должен удалять объекты, которых не было '
+            'в прошлом импорте.'
+        )
+
+    def test_04_delete_missing_requires_incremental(self, csv_dir):
+        with pytest.raises(CommandError):
+            call_command('csv_to_db', 'all', path=csv_dir,
+                         delete_missing=True, stdout=StringIO())
+
+    def test_05_row_checksums_are_kept_per_row(self, csv_dir):
+        from reviews.models import CsvImportRow
+
+        self.load(csv_dir, 'all')
+        assert set(CsvImportRow.objects.filter(table='review')
+                   .values_list('row_id', flat=True)) == {'1', '2', '3'}, (
+            'Контрольные суммы строк должны храниться по одной записи '
+            'на строку таблицы.'
+        )
+
+    def test_06_swapped_unique_values(self, csv_dir):
+        from reviews.models import User
+
+        self.load(csv_dir, 'users')
+        write_csv(csv_dir, 'users', [
+            ('id', 'username', 'email', 'role', 'bio', 'first_name',
+             'last_name'),
+            (100, 'critic', 'reader@yamdb.fake', 'user', '', '', ''),
+            (101, 'reader', 'critic@yamdb.fake', 'moderator', '', '', ''),
+        ])
+        with pytest.raises(CommandError, match='users.csv, ids 100-101'):
+            self.load(csv_dir, 'users')
+        assert User.objects.get(pk=100).username == 'reader', (
+            'Ошибка уникальности должна откатывать пакет строк.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20ParallelCsvToDb:
+
+    def test_01_tables_follow_their_references(self):
+        from reviews.management.commands.csv_to_db import CsvToDb
+
+        order = CsvToDb.sort_tables(
+            ['comments', 'review', 'genre_title', 'titles', 'genre',
+             'category', 'users']
+        )
+        for table, references in CsvToDb.dependencies().items():
+            for reference in references:
+                assert order.index(reference) < order.index(table), (
+                    f'Таблица `{table}` должна загружаться после '
+                    f'`{reference}`.'
+                )
+
+    @pytest.mark.parametrize('incremental', (False, True))
+    def test_02_parallel_load(self, csv_dir, incremental):
+        from reviews.models import Comment, GenreTitle, Review, Title
+
+        call_command('csv_to_db', 'all', path=csv_dir, jobs=3, batch_size=2,
+                     incremental=incremental, stdout=StringIO())
+        assert (
+            Title.objects.count(), GenreTitle.objects.count(),
+            Review.objects.count(), Comment.objects.count()
+        ) == (3, 2, 3, 1), (
+            'С `--jobs` команда `csv_to_db` должна загружать все строки.'
+        )
+        assert Title.objects.get(pk=1).rating == 9, (
+            'С `--jobs` рейтинги должны пересчитываться после загрузки.'
+        )
+
+    @pytest.mark.parametrize('jobs', (1, 3))
+    def test_03_invalid_row(self, csv_dir, jobs):
+        from reviews.models import Review
+
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (1, 1, 'Отлично', 100, 10, '2019-09-24T21:08:21.567Z'),
+            (2, 1, 'Слишком хорошо', 101, 11, '2019-09-24T21:08:21.567Z'),
+        ])
+        with pytest.raises(CommandError, match='review.csv, row 2'):
+            call_command('csv_to_db', 'all', path=csv_dir, jobs=jobs,
+                         stdout=StringIO())
+        assert not Review.objects.filter(pk=2).exists(), (
+            'Строки, не прошедшие проверку, не должны загружаться.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20FastCsvToDb:
+
+    def get_indexes(self):
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index'"
+            )
+            return set(cursor.fetchall())
+
+    def get_synchronous(self):
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            return cursor.fetchone()[0]
+
+    def test_01_fast_load(self, csv_dir, monkeypatch):
+        from reviews.management.commands.csv_to_db import CsvToDb
+        from reviews.models import Review, Title
+
+        indexes = self.get_indexes()
+        synchronous = self.get_synchronous()
+        during_load = []
+        verify = CsvToDb.verify
+
+        def checked_verify(loader, tables):
+            during_load.append(self.get_synchronous())
+            return verify(loader, tables)
+
+        monkeypatch.setattr(CsvToDb, 'verify', checked_verify)
+        call_command('csv_to_db', 'all', path=csv_dir, fast=True,
+                     stdout=StringIO())
+        assert (during_load, self.get_synchronous()) == ([0], synchronous), (
+            'С `--fast` синхронизация SQLite должна отключаться на время '
+            'загрузки и восстанавливаться после неё.'
+        )
+        assert (Title.objects.count(), Review.objects.count()) == (3, 3), (
+            'С `--fast` команда `csv_to_db` должна загружать все строки.'
+        )
+        assert Title.objects.get(pk=1).rating == 9, (
+            'С `--fast` рейтинги должны пересчитываться после загрузки.'
+        )
+        assert self.get_indexes() == indexes, (
+            'После загрузки с `--fast` индексы должны быть восстановлены.'
+        )
+
+    def test_02_orphans_are_reported(self, csv_dir):
+        from reviews.models import Review
+
+        write_csv(csv_dir, 'review', [
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+            (1, 1, 'Отлично', 100, 10, '2019-09-24T21:08:21.567Z'),
+            (2, 99, 'Нет такого произведения', 101, 8,
+             '2019-09-24T21:08:21.567Z'),
+        ])
+        indexes = self.get_indexes()
+        with pytest.raises(CommandError) as error:
+            call_command('csv_to_db', 'all', path=csv_dir, fast=True,
+                         stdout=StringIO())
+        assert 'review: 1 rows reference a missing title, e.g. ids [2]' in (
+            str(error.value)
+        ), 'С `--fast` строки с несуществующими ссылками должны выводиться.'
+        assert not Review.objects.exists(), (
+            'Загрузка с `--fast`, не прошедшая проверку, должна '
+            'откатываться целиком.'
+        )
+        assert self.get_indexes() == indexes, (
+            'После отката загрузки с `--fast` индексы должны сохраниться.'
+        )
+
+    def test_03_non_empty_tables_are_refused(self, csv_dir):
+        from reviews.models import Category
+
+        Category.objects.create(name='Книга', slug='book')
+        with pytest.raises(CommandError, match='category'):
+            call_command('csv_to_db', 'all', path=csv_dir, fast=True,
+                         stdout=StringIO())
+        assert Category.objects.count() == 1
@@ -0,0 +1,96 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+DATA_DIR = settings.BASE_DIR / 'static/data'
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as fp:
+        return list(csv.DictReader(fp))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21DbToCsv:
+
+    @pytest.fixture(autouse=True)
+    def load_data(self):
+        call_command('csv_to_db', 'all', stdout=StringIO())
+
+    def export(self, *tables, **options):
+        output = StringIO()
+        call_command('db_to_csv', *tables, stdout=output, **options)
+        return output.getvalue()
+
+    def test_01_csv_layout(self, tmp_path):
+        self.export('all', path=tmp_path, batch_size=10)
+        for table in ('users', 'category', 'genre', 'genre_title'):
+            assert read_csv(tmp_path / f'{table}.csv') == read_csv(
+                DATA_DIR / f'{table}.csv'
+            ), (
+                f'Команда `db_to_csv` должна выгружать `{table}` в формате, '
+                'который читает `csv_to_db`.'
+            )
+
+    def test_02_round_trip(self, tmp_path):
+        from reviews.models import Comment, Review, Title, User
+
+        self.export('all', path=tmp_path)
+        texts = list(
+            Review.objects.order_by('pk').values_list('text', 'pub_date')
+        )
+        Title.objects.all().delete()
+        User.objects.all().delete()
+        call_command('csv_to_db', 'all', path=tmp_path, stdout=StringIO())
+        assert (Review.objects.count(), Comment.objects.count()) == (72, 3), (
+            'Выгрузка `db_to_csv` должна загружаться командой `csv_to_db`.'
+        )
+        assert list(
+            Review.objects.order_by('pk').values_list('text', 'pub_date')
+        ) == texts, (
+            'Текст и дата публикации отзывов должны сохраняться '
+            'при выгрузке.'
+        )
+
+    def test_03_ndjson_gzip(self, tmp_path):
+        from reviews.models import Review
+
+        self.export('review', path=tmp_path, format='ndjson', gzip=True)
+        with gzip.open(tmp_path / 'review.ndjson.gz', 'rt',
+                       encoding='utf-8') as fp:
+            rows = [json.loads(line) for line in fp]
+        assert len(rows) == Review.objects.count(), (
+            'В NDJSON каждая строка таблицы должна быть отдельной строкой.'
+        )
+        assert list(rows[0]) == [
+            'id', 'title_id', 'text', 'author', 'score', 'pub_date'
+        ], 'Ключи NDJSON должны совпадать с колонками CSV.'
+
+    def test_04_chunks_resume(self, tmp_path):
+        self.export('review', path=tmp_path, chunk_size=20, batch_size=7)
+        chunks = sorted(tmp_path.glob('review.*-*.csv'))
+        assert len(chunks) == 4, (
+            'С `--chunk-size` таблица должна выгружаться в несколько файлов.'
+        )
+        assert sum(len(read_csv(chunk)) for chunk in chunks) == 72
+        last_chunk = chunks[-1]
+        last_chunk.unlink()
+        output = self.export('review', path=tmp_path, chunk_size=20)
+        assert 'review: 12 rows' in output, (
+            'Повторный запуск должен продолжать выгрузку после последнего '
+            'полного файла.'
+        )
+        assert sorted(tmp_path.glob('review.*-*.csv')) == chunks
+        assert not list(tmp_path.glob('*.part'))
+
+    def test_05_id_range(self, tmp_path):
+        self.export('review', path=tmp_path, from_id=10, to_id=19)
+        ids = [int(row['id']) for row in read_csv(tmp_path / 'review.csv')]
+        assert ids and min(ids) >= 10 and max(ids) <= 19, (
+            'Параметры `--from-id` и `--to-id` должны ограничивать выгрузку.'
+        )
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Max
+
+SIZES = {'users': 50, 'titles': 40, 'reviews': 400, 'comments': 100,
+         'categories': 3, 'genres': 5}
+
+
+def generate(**options):
+    call_command('generate_dataset', stdout=StringIO(),
+                 **{**SIZES, **options})
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22GenerateDataset:
+
+    def test_01_load(self):
+        from reviews.models import Comment, Review, Title, User
+
+        generate(batch_size=64)
+        assert (
+            User.objects.count(), Title.objects.count(),
+            Review.objects.count(), Comment.objects.count()
+        ) == (50, 40, 400, 100), (
+            'Команда `generate_dataset` должна загружать заданное '
+            'количество объектов.'
+        )
+        counts = sorted(Title.objects.values_list('review_count', flat=True))
+        assert counts[-1] >= 5 * counts[len(counts) // 2], (
+            'Отзывы должны концентрироваться на популярных произведениях.'
+        )
+        assert not Title.objects.filter(
+            review_count__gt=0, rating__isnull=True
+        ).exists(), 'После генерации рейтинги должны быть пересчитаны.'
+        assert Review.objects.aggregate(Max('pub_date'))['pub_date__max'] < (
+            datetime(2024, 1, 1, tzinfo=timezone.utc)
+        ), 'Сгенерированные даты публикации должны сохраняться в базе.'
+
+    def test_02_reproducible_csv(self, tmp_path):
+        generate(path=tmp_path / 'first', seed=7)
+        generate(path=tmp_path / 'second', seed=7)
+        generate(path=tmp_path / 'other', seed=8)
+        for table in ('users', 'titles', 'genre_title', 'review',
+                      'comments'):
+            first = (tmp_path / 'first' / f'{table}.csv').read_bytes()
+            assert first == (
+                tmp_path / 'second' / f'{table}.csv'
+            ).read_bytes(), (
+                'С одинаковым `--seed` должен получаться одинаковый набор '
+                'данных.'
+            )
+        assert (tmp_path / 'first' / 'review.csv').read_bytes() != (
+            tmp_path / 'other' / 'review.csv'
+        ).read_bytes(), 'Разные `--seed` должны давать разные данные.'
+
+    def test_03_csv_loads_with_csv_to_db(self, tmp_path):
+        from reviews.models import Comment, Review
+
+        generate(path=tmp_path)
+        assert not Review.objects.exists(), (
+            'С `--path` данные должны только записываться в файлы.'
+        )
+        call_command('csv_to_db', 'all', path=tmp_path, stdout=StringIO())
+        assert (Review.objects.count(), Comment.objects.count()) == (
+            400, 100
+        ), 'Файлы `generate_dataset` должны загружаться `csv_to_db`.'
+
+    def test_04_requires_empty_db(self, user):
+        with pytest.raises(CommandError):
+            generate()
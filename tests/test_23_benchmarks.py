@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from benchmarks.harness import compare, measure, percentile
+
+SIZES = {'users': 20, 'titles': 10, 'reviews': 40, 'comments': 20,
+         'categories': 2, 'genres': 3}
+
+
+class Test23Harness:
+
+    def test_01_percentile(self):
+        values = [5, 1, 4, 2, 3]
+        assert (
+            percentile(values, 0.5), percentile(values, 0.95),
+            percentile(values, 0), percentile(values, 1)
+        ) == (3, 4.8, 1, 5), (
+            'Перцентили должны считаться с линейной интерполяцией.'
+        )
+        assert percentile([], 0.5) == 0, (
+            'Перцентиль пустой выборки должен быть равен 0.'
+        )
+
+    def test_02_compare(self):
+        old = {
+            'titles_list': {'p95_ms': 10.0, 'queries_p50': 3},
+            'users_list': {'p95_ms': 5.0, 'queries_p50': 1},
+        }
+        new = {
+            'titles_list': {'p95_ms': 11.0, 'queries_p50': 4},
+            'users_list': {'p95_ms': 7.0, 'queries_p50': 1},
+            'users_me': {'p95_ms': 1.0, 'queries_p50': 1},
+        }
+        assert compare(old, new, threshold=0.2) == [
+            'titles_list: queries 3 -> 4',
+            'users_list: p95 5.00 -> 7.00 ms',
+        ], (
+            'Регрессией должен считаться рост p95 больше порога или '
+            'рост числа запросов; новые сценарии не сравниваются.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Scenarios:
+
+    def test_01_all_routes(self, settings):
+        from api.urls import router_v1
+        from benchmarks.scenarios import build_scenarios, prepare_clients
+
+        call_command('generate_dataset', stdout=StringIO(), **SIZES)
+        clients = prepare_clients()
+        scenarios = build_scenarios(4)
+        names = {scenario.name for scenario in scenarios}
+        for _, _, basename in router_v1.registry:
+            assert {f'{basename}_list', f'{basename}_create'} <= names, (
+                f'Бенчмарк должен покрывать маршрут `{basename}`.'
+            )
+        assert {'auth_signup', 'auth_token'} <= names, (
+            'Бенчмарк должен покрывать регистрацию и получение токена.'
+        )
+
+        rest_framework = {**settings.REST_FRAMEWORK,
+                          'DEFAULT_THROTTLE_RATES': {}}
+        results = {}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            for scenario in scenarios:
+                result = measure(scenario, clients[scenario.role],
+                                 requests=3, warmup=0)
+                results[scenario.name] = result
+                assert result['errors'] == 0, (
+                    f'Сценарий `{scenario.name}` должен выполняться '
+                    f'без ошибок.'
+                )
+                assert result['p50_ms'] <= result['p95_ms'] <= (
+                    result['p99_ms']
+                ), 'Перцентили должны быть упорядочены.'
+                assert result['peak_memory_kib'] > 0, (
+                    'Должен измеряться пик памяти запроса.'
+                )
+        assert results['titles_detail']['queries_p50'] > 0, (
+            'Должно считаться число SQL-запросов.'
+        )
+
+    def test_02_reviews_create_repeats_titles(self, settings):
+        from benchmarks.scenarios import build_scenarios, prepare_clients
+
+        call_command('generate_dataset', stdout=StringIO(), **SIZES)
+        clients = prepare_clients()
+        requests = SIZES['titles'] * 2
+        scenario, = [item for item in build_scenarios(requests + 1)
+                     if item.name == 'reviews_create']
+        rest_framework = {**settings.REST_FRAMEWORK,
+                          'DEFAULT_THROTTLE_RATES': {}}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            result = measure(scenario, clients[scenario.role],
+                             requests=requests, warmup=0)
+        assert result['errors'] == 0, (
+            'Отзывы должны создаваться без ошибок, даже когда запросов '
+            'больше, чем произведений.'
+        )